@@ -0,0 +1,103 @@
+# aggregates.py
+"""Dashboard aggregates maintained incrementally by triggers.
+
+student_attendance_stats, student_result_stats and slot_headcounts are
+updated by triggers (see Database.add_dashboard_aggregates) on every write
+to attendance, results and students, so the dashboard reads a few rows per
+student. rebuild_aggregates() recomputes them from scratch and
+verify_aggregates() compares the live tables against that recompute.
+
+Usage: python aggregates.py --verify | --rebuild
+"""
+import sys
+
+from database import get_db_connection
+
+# A result passes on marks >= 60 (grade D or better) or, without marks, on its status.
+# {r} is the table alias or trigger row (NEW/OLD).
+RESULT_PASSED_SQL = "(CASE WHEN {r}.marks IS NOT NULL THEN {r}.marks >= 60 ELSE lower({r}.status) IN ('passed', 'pass') END)"
+
+# Full recomputes: table -> (key column, SELECT producing the expected rows)
+RECOMPUTE_SQL = {
+    'student_attendance_stats': ('student_id', '''
+        SELECT student_id, COUNT(*) AS days_recorded, SUM(status = 'present') AS days_present
+        FROM attendance GROUP BY student_id'''),
+    'student_result_stats': ('student_id', f'''
+        SELECT student_id, COUNT(*) AS courses, SUM({RESULT_PASSED_SQL.format(r='results')}) AS passed
+        FROM results GROUP BY student_id'''),
+    'slot_headcounts': ('slot', '''
+        SELECT slot, COUNT(*) AS students FROM students GROUP BY slot'''),
+}
+
+
+def rebuild_aggregates(cursor):
+    """Recomputes every aggregate table from the base tables on the caller's cursor."""
+    for table, (_, select) in RECOMPUTE_SQL.items():
+        cursor.execute(f"DELETE FROM {table}")
+        cursor.execute(f"INSERT INTO {table} {select}")
+
+
+def verify_aggregates(cursor):
+    """Returns {table: [(key, live row, recomputed row), ...]} for every mismatch.
+
+    The triggers delete a row once its last base row is gone, so a leftover
+    zeroed row counts as a mismatch.
+    """
+    mismatches = {}
+    for table, (key, select) in RECOMPUTE_SQL.items():
+        cursor.execute(select)
+        expected = {row[key]: tuple(row) for row in cursor.fetchall()}
+        cursor.execute(f"SELECT * FROM {table}")
+        live = {row[key]: tuple(row) for row in cursor.fetchall()}
+        diffs = [(k, live.get(k), expected.get(k)) for k in live.keys() | expected.keys() if live.get(k) != expected.get(k)]
+        if diffs:
+            mismatches[table] = diffs
+    return mismatches
+
+
+def student_summary(student_id):
+    """Returns attendance and result counters for one student (two primary-key reads)."""
+    with get_db_connection() as cursor:
+        cursor.execute("SELECT days_recorded, days_present FROM student_attendance_stats WHERE student_id = ?", (student_id,))
+        attendance = cursor.fetchone()
+        cursor.execute("SELECT courses, passed FROM student_result_stats WHERE student_id = ?", (student_id,))
+        results = cursor.fetchone()
+    days_recorded, days_present = attendance if attendance else (0, 0)
+    courses, passed = results if results else (0, 0)
+    return {
+        'days_recorded': days_recorded,
+        'days_present': days_present,
+        'attendance_pct': 100.0 * days_present / days_recorded if days_recorded else None,
+        'courses': courses,
+        'courses_passed': passed,
+    }
+
+
+def course_statuses(student_id):
+    """Per-course results for one student, read through the UNIQUE(student_id, course_id) index."""
+    with get_db_connection() as cursor:
+        cursor.execute('''
+            SELECT c.name AS course, r.status, r.marks FROM results r JOIN courses c ON c.id = r.course_id
+            WHERE r.student_id = ? ORDER BY c.id
+        ''', (student_id,))
+        return cursor.fetchall()
+
+
+def slot_headcounts():
+    with get_db_connection() as cursor:
+        cursor.execute("SELECT slot, students FROM slot_headcounts WHERE students > 0 ORDER BY slot")
+        return cursor.fetchall()
+
+
+if __name__ == "__main__":
+    from database import setup_database
+    setup_database()
+    with get_db_connection() as cursor:
+        if "--rebuild" in sys.argv:
+            rebuild_aggregates(cursor)
+            print("Aggregates rebuilt.")
+        problems = verify_aggregates(cursor)
+    for table, diffs in problems.items():
+        print(f"{table}: {len(diffs)} mismatched rows, e.g. {diffs[:3]}")
+    print("Aggregates match a full recompute." if not problems else "Aggregates are out of date; run with --rebuild.")
+    sys.exit(1 if problems else 0)
@@ -1,44 +1,32 @@
 import streamlit as st # type: ignore
 import sqlite3
 from contextlib import contextmanager
-from database import get_db_connection, setup_database
+from database import setup_database, query_count, reset_query_count
+import queries
+import aggregates
+from passwords import PasswordPoolBusy
+import profile_cache
+import card_cache
+import photos
+import export
+import metrics
+import search
+import payments
+from reference import get_reference_data
+from attendance import AttendanceWriter, CHECK_IN, CHECK_OUT, roll_number_from_qr
+from payments import PaymentProcessor, SUCCEEDED, FINAL_STATUSES
 from PIL import Image # type: ignore
 import io
+import os
+from contextlib import nullcontext
 
 st.sidebar.header("GIAIC Student Portal")
 
-slot_teacher_map = {
-    "Monday 2-5 PM": "Sir Zia",
-    "Tuesday 2-5 PM": "Sir Asharib",
-    "Wednesday 2-5 PM": "Sir Ali Aftab",
-    "Thursday 2-5 PM": "Sir Aneeq",
-    "Friday 2-5 PM": "Sir Hamzah Syed",
-    "Saturday 2-5 PM": "Sir Ali Aftab",
-    "Sunday 2-5 PM": "Sir Muhammad Bilal Khan"
-}
-
-faq_data = {
-    "Typescript": [
-        "What are the benefits of using TypeScript?",
-        "How does TypeScript relate to JavaScript?",
-        "What are interfaces and types in TypeScript?"
-    ],
-    "Next.js": [
-        "What is Next.js and what is it used for?",
-        "What are the key features of Next.js?",
-        "How does routing work in Next.js?"
-    ],
-    "Python": [
-        "What are the basic data types in Python?",
-        "How do you define functions in Python?",
-        "What are some popular libraries in Python?"
-    ],
-    "General": [
-        "How do I register for a course?",
-        "What if I forget my password?",
-        "Who should I contact for technical support?"
-    ]
-}
+# Usernames allowed to see the Admin page, e.g. PORTAL_ADMINS="alice,bob"
+ADMIN_USERS = {name.strip() for name in os.environ.get("PORTAL_ADMINS", "").split(",") if name.strip()}
+# PORTAL_KIOSK=1 on the check-in desk's deployment shows Attendance Check-In to
+# every session; elsewhere only admins can record check-ins
+KIOSK_MODE = os.environ.get("PORTAL_KIOSK", "").lower() in ("1", "true", "yes")
 
 def register():
     st.header("📋 Student Registration")
@@ -50,12 +38,12 @@ def register():
             st.warning("Please fill all fields.")
             return
         try:
-            with get_db_connection() as cursor:
-                cursor.execute("INSERT INTO students (username, password, name, roll_number, class, slot, photo) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                               ('new_user', password, '', '', '', '', None)) # Basic insert, more details in profile
+            queries.register_student(username, password) # Basic insert, more details in profile
             st.success("Registration successful! Now login.")
-        except sqlite3.IntegrityError:
-            st.error("Username already exists.")
+        except PasswordPoolBusy as e:
+            st.error(str(e))
+        except sqlite3.IntegrityError as e:
+            st.error(queries.duplicate_message(e))
 
 def login():
     st.header("🔐 Student Login")
@@ -66,20 +54,46 @@ def login():
         if not all([username, password]):
             st.warning("Please fill all fields.")
             return
-        with get_db_connection() as cursor:
-            cursor.execute("SELECT * FROM students WHERE username = ? AND password = ?", (username, password))
-            user = cursor.fetchone()
-            if user:
-                st.session_state.logged_in = True
-                st.session_state.username = username
-                st.success("Logged in successfully.")
-            else:
-                st.error("Invalid credentials.")
+        try:
+            user_id = queries.authenticate(username, password)
+        except PasswordPoolBusy as e:
+            st.error(str(e))
+            return
+        if user_id is not None:
+            st.session_state.logged_in = True
+            st.session_state.username = username
+            profile_cache.load_profile(username)
+            st.success("Logged in successfully.")
+        else:
+            st.error("Invalid credentials.")
 
 def dashboard():
     st.header(f"📊 Dashboard")
     if st.session_state.logged_in:
         st.subheader(f"Welcome, {st.session_state.username}!")
+        profile = profile_cache.get_profile()
+        if profile:
+            thumbnail = profile_cache.get_profile_thumbnail()
+            if thumbnail:
+                st.image(thumbnail, caption=profile['name'], width=150)
+            summary = aggregates.student_summary(profile['id'])
+            col1, col2 = st.columns(2)
+            attendance_pct = summary['attendance_pct']
+            col1.metric("Attendance", "N/A" if attendance_pct is None else f"{attendance_pct:.0f}%",
+                        help=f"{summary['days_present']} of {summary['days_recorded']} recorded days")
+            col2.metric("Courses Passed", f"{summary['courses_passed']} / {summary['courses']}")
+
+            st.subheader("Course Status:")
+            statuses = aggregates.course_statuses(profile['id'])
+            if statuses:
+                for row in statuses:
+                    marks = "" if row['marks'] is None else f" ({row['marks']} marks)"
+                    st.markdown(f"- **{row['course']}**: {row['status']}{marks}")
+            else:
+                st.write("No results recorded yet.")
+
+        st.subheader("Students per Slot:")
+        st.table([{"Slot": row['slot'], "Students": row['students']} for row in aggregates.slot_headcounts()])
         st.info("All card generation features are now under 'GIAIC Card Generator' in the navigation.")
     else:
         st.info("Please log in to view the dashboard.")
@@ -87,6 +101,7 @@ def dashboard():
 
 def faqs():
     st.header("❓ Frequently Asked Questions")
+    faq_data = get_reference_data().faqs
     course = st.selectbox("Select a Course", list(faq_data.keys()))
     if course:
         st.subheader(f"FAQs for {course}:")
@@ -96,6 +111,13 @@ def faqs():
 def card_generator():
     st.subheader("💳 GIAIC Card Generator")
     col1, col2 = st.columns(2)
+    # Filled first so the Generate button below can see the upload
+    with col2:
+        uploaded_file = st.file_uploader("Upload Profile Picture", type=["jpg", "jpeg", "png"])
+        if uploaded_file is not None:
+            image = Image.open(uploaded_file)
+            st.image(image, caption="Uploaded Profile Picture", width=150)
+
     with col1:
         name = st.text_input("Name")
         roll_number = st.text_input("Roll Number", placeholder="e.g., GIAIC-SP24-001")
@@ -106,13 +128,31 @@ def card_generator():
 
         if st.button("Generate Card"):
             if name and roll_number and card_slot and timings and uploaded_file:
-                st.success("Card Generated!") # Placeholder for actual card generation
+                card_data = {
+                    'name': name,
+                    'roll_no': roll_number,
+                    'slot': f"{card_slot} {timings}",
+                    'photo': uploaded_file.getvalue(),
+                }
+                profile = profile_cache.get_profile() if st.session_state.logged_in else None
+                try:
+                    if profile:
+                        # Keep the upload as the student's photo; the card uses its stored thumbnail
+                        card_data['photo_hash'] = photos.set_student_photo(profile['id'], card_data['photo'])
+                        card_data['photo'] = photos.get_card_thumbnail(card_data['photo_hash'])
+                        profile_cache.invalidate_profile()
+                except OSError:
+                    st.error("Could not read the uploaded picture.")
+                else:
+                    st.session_state.card_data = card_data
+                    st.success("Card Generated!")
             elif any([not name, not roll_number, not card_slot, not timings, uploaded_file is None]):
                 st.warning("Please fill all the information and upload a profile picture.")
 
         st.subheader("Course Information:")
         # Display Slot Selection (related to teacher)
         st.subheader("Select Class Slot:")
+        slot_teacher_map = get_reference_data().slot_teachers
         available_slots = list(slot_teacher_map.keys())
         teacher_slot = st.selectbox("Available Slots", available_slots)
         st.write(f"Selected Class Slot: {teacher_slot}")
@@ -133,82 +173,249 @@ def card_generator():
         st.markdown("- **Q4: Agentic AI - Next & last quarter**")
 
     with col2:
-        uploaded_file = st.file_uploader("Upload Profile Picture", type=["jpg", "jpeg", "png"])
-        if uploaded_file is not None:
-            image = Image.open(uploaded_file)
-            st.image(image, caption="Uploaded Profile Picture", width=150)
+        if 'card_data' in st.session_state:
+            # Served from the rendered-card cache unless the inputs changed
+            etag, card = card_cache.get_card(st.session_state.card_data)
+            st.image(card, caption="Your GIAIC ID Card")
+            st.download_button("Download Card", card, file_name=f"{st.session_state.card_data['roll_no']}.png",
+                               mime="image/png", key=f"download_{etag[:12]}")
+
+@st.cache_resource
+def attendance_writer():
+    # One background writer per server process, shared by every session
+    return AttendanceWriter()
+
+def attendance_check_in():
+    st.header("🕒 Attendance Check-In")
+    if not can_check_in():
+        st.error("Attendance is recorded at the check-in desk.")
+        return
+    scanned = st.text_input("Scan ID card QR code or enter roll number", key="attendance_scan")
+    col_in, col_out = st.columns(2)
+    for column, label, kind in ((col_in, "Check In", CHECK_IN), (col_out, "Check Out", CHECK_OUT)):
+        if column.button(label):
+            roll_number = roll_number_from_qr(scanned)
+            if not roll_number:
+                st.warning("Please scan a card or enter a roll number.")
+            elif not queries.roll_number_exists(roll_number):
+                # Deliberately vague, so the page cannot be used to probe for roll numbers
+                st.error("This card could not be checked in. Please see the front desk.")
+            else:
+                # Written by the background writer within a fraction of a second
+                attendance_writer().submit(roll_number, kind)
+                st.success(f"{label} queued for {roll_number}.")
+
+@st.cache_resource
+def payment_processor():
+    # One asyncio payment worker per server process, shared by every session
+    return PaymentProcessor()
+
+def show_payment(intent):
+    if intent['status'] == SUCCEEDED:
+        st.success(f"{intent['message']} (${intent['amount']:.2f}).")
+    elif intent['status'] in FINAL_STATUSES:
+        st.error(f"{intent['message']}.")
+    else:
+        st.info(f"Processing your ${intent['amount']:.2f} payment… (attempt {max(intent['attempts'], 1)})")
+
+@st.fragment(run_every=1)
+def payment_status(intent_id):
+    # Reruns only this fragment while the worker charges the payment
+    intent = payments.get_intent(intent_id)
+    if intent['status'] in FINAL_STATUSES:
+        st.rerun()
+    show_payment(intent)
+
+def make_payment():
+    st.header("💳 Payments")
+    if not st.session_state.logged_in:
+        st.info("Please log in to make a payment.")
+        login()
+        return
+    # One idempotency key per payment: clicking Pay again while it is processing
+    # returns the same intent instead of charging twice
+    if 'payment_key' not in st.session_state:
+        st.session_state.payment_key = payments.new_idempotency_key()
+    amount = st.number_input("Amount (USD)", min_value=1.0, value=10.0, step=1.0)
+    token = st.text_input("Card token", placeholder="tok_...")
+    if st.button("Pay"):
+        if not token.strip():
+            st.warning("Please enter a card token.")
+        else:
+            profile = profile_cache.get_profile()
+            st.session_state.payment_intent = payment_processor().submit(
+                amount, token.strip(), st.session_state.payment_key, profile['id'] if profile else None)
+
+    intent_id = st.session_state.get('payment_intent')
+    if intent_id is not None:
+        intent = payments.get_intent(intent_id)
+        if intent['status'] in FINAL_STATUSES:
+            show_payment(intent)
+            st.session_state.payment_key = payments.new_idempotency_key()  # The next click is a new payment
+        else:
+            payment_status(intent_id)
 
 def feedback():
     st.header("📝 Student Course Feedback")
     if st.session_state.logged_in:
-        courses = ["Typescript", "Next.js", "Python", "Agentic AI"]
+        courses = list(get_reference_data().courses)
         selected_course = st.selectbox("Select a Course", courses)
         feedback_text = st.text_area(f"Feedback for {selected_course}", "Enter your feedback here...")
         if st.button("Submit Feedback"):
-            if feedback_text:
-                st.success(f"Thank you for your feedback on {selected_course}!")
-                # In a real application, you would save this feedback to a database
-            else:
+            profile = profile_cache.get_profile()
+            if not feedback_text:
                 st.warning("Please enter your feedback.")
+            elif not profile:
+                st.error("Student profile not found.")
+            else:
+                queries.add_feedback(profile['id'], selected_course, feedback_text)
+                st.success(f"Thank you for your feedback on {selected_course}!")
     else:
         st.info("Please log in to provide feedback.")
         login()
 
+def is_admin():
+    return st.session_state.logged_in and st.session_state.username in ADMIN_USERS
+
+def can_check_in():
+    return KIOSK_MODE or is_admin()
+
+def toggle_profiling():
+    st.session_state.profile_reruns = st.session_state.profile_reruns_toggle
+
+def admin():
+    st.header("🛠️ Admin")
+    if not is_admin():
+        st.error("Admins only.")
+        return
+
+    st.subheader("Search")
+    query = st.text_input("Search students, courses and feedback", placeholder="Name, roll number, slot or feedback words")
+    if query:
+        results = search.search(query)
+        if not any(results.values()):
+            st.info("No matches.")
+        if results['students']:
+            st.markdown("**Students**")
+            st.dataframe([dict(row) for row in results['students']], hide_index=True, width="stretch")
+        if results['courses']:
+            st.markdown("**Courses**")
+            st.dataframe([dict(row) for row in results['courses']], hide_index=True, width="stretch")
+        for row in results['feedback']:
+            st.markdown(f"**{row['course']}** · {row['student']} ({row['roll_number']}) · {row['created_at']}  \n{row['excerpt']}")
+
+    st.subheader("Performance")
+    # The widget's own state is dropped once the admin leaves this page, so the
+    # flag lives in a plain session key that main() reads on every page
+    st.checkbox("Profile my reruns with cProfile", value=st.session_state.get('profile_reruns', False),
+                key="profile_reruns_toggle", on_change=toggle_profiling)
+    rows = metrics.snapshot()
+    if rows:
+        st.dataframe(rows, hide_index=True, width="stretch")
+    else:
+        st.info("No timings recorded yet.")
+    if st.button("Reset metrics"):
+        metrics.reset()
+        st.rerun()
+    for label, seconds, report in metrics.get_registry().profiles:
+        with st.expander(f"Profile: {label} ({seconds * 1000:.0f} ms)"):
+            st.code(report, language=None)
+
+    st.subheader("Card Cache")
+    stats = card_cache.cache_stats()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Hit rate", f"{stats['hit_rate']:.0%}", help=f"{stats['hits']} hits, {stats['misses']} misses since start")
+    col2.metric("Cached cards", stats['entries'])
+    col3.metric("Size", f"{stats['bytes'] / 1024 / 1024:.1f} MB", help=f"Limit {card_cache.MAX_CACHE_BYTES // 1024 // 1024} MB")
+    col4.metric("Evictions", stats['evictions'])
+
+    st.subheader("Data Export")
+    table = st.selectbox("Table", list(export.EXPORTS))
+    fmt = st.selectbox("Format", list(export.FORMATS), help="'columnar' is the compact binary PCOL format")
+    include_photos = table == 'students' and st.checkbox("Include photos")
+    mime, extension = export.FORMATS[fmt]
+    # Deferred: the export only runs when the button is clicked
+    st.download_button(f"Download {table}.{extension}", export.deferred_export(table, fmt, include_photos),
+                       file_name=f"{table}.{extension}", mime=mime)
+    st.caption("Downloads are built in server memory. For very large tables run "
+               f"`python export.py {table} {table}.{extension}` on the server, which streams to disk.")
+
 def main():
-    setup_database()
+    reset_query_count()
+    with metrics.timed('app.setup_database'):
+        notices = setup_database()
+    for notice in notices:
+        st.info(notice)
 
     if 'logged_in' not in st.session_state:
         st.session_state.logged_in = False
         st.session_state.username = ''
 
     navigation_options = ["Home", "Registration", "Login", "Dashboard", "FAQs", "GIAIC Card Generator"]
+    if can_check_in():
+        navigation_options.append("Attendance Check-In")
     if st.session_state.logged_in:
         navigation_options.append("Logout")
         navigation_options.append("Course Feedback") # Added Course Feedback
+        navigation_options.append("Payments")
+    if is_admin():
+        navigation_options.append("Admin")
 
     home_option = st.sidebar.selectbox(
         "Navigate",
         navigation_options
     )
 
-    if home_option == "Registration":
-        register()
-    elif home_option == "Login":
-        login()
-    elif home_option == "Dashboard":
-        dashboard()
-    elif home_option == "FAQs":
-        faqs()
-    elif home_option == "GIAIC Card Generator":
-        card_generator()
-    elif home_option == "Logout":
-        st.session_state.logged_in = False
-        st.session_state.username = ''
-        st.success("Logged out successfully.")
-    elif home_option == "Course Feedback":
-        feedback()
-    elif home_option == "Home":
-        st.markdown(
-            """
-            <style>
-            .background-giaic {
-                position: fixed;
-                top: 50%;
-                left: 50%;
-                transform: translate(-50%, -50%);
-                font-size: 150px;
-                font-weight: bold;
-                color: #f0f2f6; /* Light grey */
-                opacity: 0.5;
-                z-index: -1;
-            }
-            </style>
-            <div class="background-giaic">GIAIC</div>
-            <h1>Welcome to the Student Portal!</h1>
-            <p>Please use the navigation in the sidebar to access different sections.</p>
-            """,
-            unsafe_allow_html=True
-        )
+    # Opt-in per session from the Admin page; only that admin's reruns are profiled
+    profiling = st.session_state.get('profile_reruns', False)
+    with metrics.timed(f"page.{home_option}"), (metrics.profiled(home_option) if profiling else nullcontext()):
+        if home_option == "Registration":
+            register()
+        elif home_option == "Login":
+            login()
+        elif home_option == "Dashboard":
+            dashboard()
+        elif home_option == "FAQs":
+            faqs()
+        elif home_option == "GIAIC Card Generator":
+            card_generator()
+        elif home_option == "Attendance Check-In":
+            attendance_check_in()
+        elif home_option == "Logout":
+            st.session_state.logged_in = False
+            st.session_state.username = ''
+            profile_cache.invalidate_profile()
+            st.success("Logged out successfully.")
+        elif home_option == "Course Feedback":
+            feedback()
+        elif home_option == "Payments":
+            make_payment()
+        elif home_option == "Admin":
+            admin()
+        elif home_option == "Home":
+            st.markdown(
+                """
+                <style>
+                .background-giaic {
+                    position: fixed;
+                    top: 50%;
+                    left: 50%;
+                    transform: translate(-50%, -50%);
+                    font-size: 150px;
+                    font-weight: bold;
+                    color: #f0f2f6; /* Light grey */
+                    opacity: 0.5;
+                    z-index: -1;
+                }
+                </style>
+                <div class="background-giaic">GIAIC</div>
+                <h1>Welcome to the Student Portal!</h1>
+                <p>Please use the navigation in the sidebar to access different sections.</p>
+                """,
+                unsafe_allow_html=True
+            )
+
+    st.sidebar.caption(f"DB queries this rerun: {query_count()}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,214 @@
+# attendance.py
+"""Attendance check-in/out with group-committed writes.
+
+Scans are queued in memory and a background thread flushes them in batches:
+events for the same student and day are coalesced (earliest time in, latest
+time out) and written with one UPSERT per student per batch, all in a single
+transaction. A burst of check-ins at class start therefore costs a handful
+of commits instead of one per scan. A batch that hits a transient error
+(e.g. the database is locked) is retried, not dropped.
+"""
+import datetime
+import logging
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import deque, namedtuple
+
+from database import get_pool
+
+logger = logging.getLogger(__name__)
+
+CHECK_IN, CHECK_OUT = 'in', 'out'
+
+BATCH_SIZE = 500  # Flush as soon as this many events are waiting...
+MAX_DELAY = 0.2  # ...or this many seconds after the first one arrived
+QUEUE_SIZE = 50000  # Beyond this, submit() blocks (backpressure)
+WRITE_ATTEMPTS = 5  # Tries per batch on transient errors (locked/busy) before requeueing it
+RETRY_DELAY = 0.05  # Seconds before the first retry; doubles per attempt
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'  # Same format generate_id_card prints
+
+AttendanceEvent = namedtuple('AttendanceEvent', ['roll_number', 'kind', 'timestamp'])
+
+UPSERT_SQL = '''
+    INSERT INTO attendance (student_id, date, status, time_in, time_out) VALUES (?, ?, 'present', ?, ?)
+    ON CONFLICT(student_id, date) DO UPDATE SET
+        status = 'present',
+        time_in = COALESCE(MIN(attendance.time_in, excluded.time_in), attendance.time_in, excluded.time_in),
+        time_out = COALESCE(MAX(attendance.time_out, excluded.time_out), attendance.time_out, excluded.time_out)
+'''
+
+_QR_ROLL_NUMBER = re.compile(r"Roll No: ([^,]+)")
+
+
+def roll_number_from_qr(payload):
+    """Extracts the roll number from an ID card QR payload (or returns a bare roll number)."""
+    match = _QR_ROLL_NUMBER.search(payload)
+    return (match.group(1) if match else payload).strip()
+
+
+def coalesce(events, student_ids):
+    """Folds events into {(student_id, date): [time_in, time_out]}.
+
+    Returns (rows, unknown) where unknown counts events for unregistered roll numbers.
+    """
+    rows = {}
+    unknown = 0
+    for event in events:
+        student_id = student_ids.get(event.roll_number)
+        if student_id is None:
+            unknown += 1
+            continue
+        stamp = event.timestamp.strftime(TIME_FORMAT)
+        times = rows.setdefault((student_id, stamp[:10]), [None, None])
+        if event.kind == CHECK_IN:
+            times[0] = stamp if times[0] is None else min(times[0], stamp)
+        else:
+            times[1] = stamp if times[1] is None else max(times[1], stamp)
+    return rows, unknown
+
+
+class AttendanceWriter:
+    """Queues attendance events and group-commits them from a background thread."""
+    def __init__(self, batch_size=BATCH_SIZE, max_delay=MAX_DELAY, queue_size=QUEUE_SIZE):
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._count_lock = threading.Lock()
+        self._roll_numbers = {}  # roll_number -> student id, filled lazily
+        self._requeued = []  # A batch that kept failing transiently, written before anything newer
+        self.submitted = 0
+        self.written = 0
+        self.unknown = 0
+        self.failed = 0
+        self.batches = 0
+        self.commit_latencies = deque(maxlen=10000)  # Seconds per flush transaction
+        self._thread = threading.Thread(target=self._run, name="attendance-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, roll_number, kind=CHECK_IN, timestamp=None, timeout=None):
+        """Queues one check-in/out. Returns immediately unless the queue is full."""
+        if kind not in (CHECK_IN, CHECK_OUT):
+            raise ValueError(f"Unknown attendance event kind: {kind!r}")
+        self._queue.put(AttendanceEvent(roll_number, kind, timestamp or datetime.datetime.now()), timeout=timeout)
+        with self._count_lock:
+            self.submitted += 1
+
+    def scan(self, qr_payload, kind=CHECK_IN):
+        """Queues an event from a scanned ID card QR code."""
+        self.submit(roll_number_from_qr(qr_payload), kind)
+
+    def _drain(self, first):
+        events = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(events) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                events.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return events
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self._requeued:
+                events, self._requeued = self._requeued, []
+            else:
+                try:
+                    first = self._queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                events = self._drain(first)
+            self._write_with_retry(events)
+
+    def _write_with_retry(self, events):
+        """Writes a batch, retrying transient errors with backoff.
+
+        A batch that still fails is requeued ahead of newer events, so while
+        the database stays unavailable the queue fills and submit() blocks
+        instead of events being dropped. Other errors cannot succeed on
+        retry; those batches are logged and counted as failed.
+        """
+        for attempt in range(WRITE_ATTEMPTS):
+            try:
+                self._write(events)
+                return
+            except sqlite3.OperationalError as e:
+                logger.warning("Attendance batch of %d events failed (attempt %d): %s", len(events), attempt + 1, e)
+                time.sleep(RETRY_DELAY * 2 ** attempt)
+            except Exception:
+                # Keep the writer alive; the batch is counted as failed
+                logger.exception("Failed to write %d attendance events", len(events))
+                self.failed += len(events)
+                return
+        self._requeued = events
+
+    def _resolve(self, conn, roll_numbers):
+        missing = [roll for roll in roll_numbers if roll not in self._roll_numbers]
+        for start in range(0, len(missing), 500):  # Stay under SQLite's bound-parameter limit
+            chunk = missing[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            for row in conn.execute(f"SELECT id, roll_number FROM students WHERE roll_number IN ({placeholders})", chunk):
+                self._roll_numbers[row['roll_number']] = row['id']
+
+    def _write(self, events):
+        with self._flush_lock, get_pool().connection() as conn:
+            self._resolve(conn, {event.roll_number for event in events})
+            rows, unknown = coalesce(events, self._roll_numbers)
+            start = time.perf_counter()
+            try:
+                conn.executemany(UPSERT_SQL, ((student_id, date, time_in, time_out)
+                                              for (student_id, date), (time_in, time_out) in rows.items()))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            self.commit_latencies.append(time.perf_counter() - start)
+            self.written += len(events) - unknown
+            self.unknown += unknown
+            self.batches += 1
+
+    def flush(self):
+        """Synchronously writes everything queued so far, batch_size events per transaction."""
+        events, self._requeued = self._requeued, []
+        while True:
+            while len(events) < self.batch_size:
+                try:
+                    events.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not events:
+                return
+            self._write(events)
+            events = []
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.flush()
+
+    def stats(self):
+        latencies = sorted(self.commit_latencies)
+        def pct(p):
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else 0.0
+        return {
+            'submitted': self.submitted, 'written': self.written, 'unknown': self.unknown, 'failed': self.failed,
+            'pending': self._queue.qsize(), 'batches': self.batches,
+            'commit_p50_ms': pct(0.50), 'commit_p99_ms': pct(0.99), 'commit_max_ms': pct(1.0),
+        }
+
+
+def todays_times(student_id, date=None):
+    """Returns (time_in, time_out) recorded for a student on a day (default today)."""
+    date = date or datetime.date.today().isoformat()
+    with get_pool().connection() as conn:
+        row = conn.execute("SELECT time_in, time_out FROM attendance WHERE student_id = ? AND date = ?",
+                           (student_id, date)).fetchone()
+    return (row['time_in'], row['time_out']) if row else (None, None)
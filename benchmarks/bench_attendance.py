@@ -0,0 +1,81 @@
+"""Attendance load test: sustained check-in events/sec and group-commit latency.
+
+Simulates a class-start burst: many scanner threads check students in (and
+later out) as fast as they can while the writer batches them.
+
+Usage: python benchmarks/bench_attendance.py [--students 5000] [--scanners 8] [--seconds 5]
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+from attendance import AttendanceWriter, CHECK_IN, CHECK_OUT  # noqa: E402
+
+
+def seed(students):
+    db = database.Database()
+    db.conn.executemany(
+        "INSERT INTO students (username, password, name, roll_number, class, slot) VALUES (?, ?, ?, ?, ?, ?)",
+        ((f"user{i}", "pw", f"Student {i}", f"GIAIC-{i:06d}", "Batch 2024", "Monday 2-5 PM") for i in range(students)),
+    )
+    db.conn.commit()
+    db.close()
+
+
+def scanner(writer, students, stop, seed_value):
+    rng = random.Random(seed_value)
+    base = datetime.datetime(2026, 1, 5, 14, 0, 0)
+    while not stop.is_set():
+        i = rng.randrange(students)
+        kind = CHECK_IN if rng.random() < 0.7 else CHECK_OUT
+        # Spread over 30 class days so the UPSERTs hit both new and existing rows
+        stamp = base + datetime.timedelta(days=rng.randrange(30), seconds=rng.randrange(10800))
+        writer.submit(f"GIAIC-{i:06d}", kind, stamp)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--scanners", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        seed(args.students)
+        writer = AttendanceWriter()
+        stop = threading.Event()
+        threads = [threading.Thread(target=scanner, args=(writer, args.students, stop, n)) for n in range(args.scanners)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        writer.close()
+        elapsed = time.perf_counter() - start
+
+        stats = writer.stats()
+        with database.get_db_connection() as cursor:
+            rows = cursor.execute("SELECT COUNT(*) FROM attendance").fetchone()[0]
+        database.close_pool()
+
+    print(f"students={args.students} scanners={args.scanners} seconds={elapsed:.1f}")
+    print(f"events written : {stats['written']} ({stats['written'] / elapsed:,.0f} events/sec), "
+          f"{stats['batches']} batches, {rows} attendance rows")
+    print(f"commit latency : p50 {stats['commit_p50_ms']:.1f} ms  p99 {stats['commit_p99_ms']:.1f} ms  "
+          f"max {stats['commit_max_ms']:.1f} ms")
+    assert stats['written'] == stats['submitted'], stats
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Per-card render latency: cold (fonts + template rebuilt every call) vs cached template.
+
+Usage: python benchmarks/bench_card.py [--cards 200]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image  # noqa: E402  # type: ignore
+
+import features  # noqa: E402
+
+
+def sample_student(i, photo):
+    return {
+        'name': f"Student {i}",
+        'roll_no': f"GIAIC-{i:06d}",
+        'email': f"student{i}@example.com",
+        'slot': "Monday 2-5 PM",
+        'contact': "0300-0000000",
+        'course': "Python",
+        'favorite_teacher': "Sir Zia",
+        'photo': photo,
+    }
+
+
+def measure(cards, photo, cold):
+    timings = []
+    for i in range(cards):
+        if cold:
+            features.clear_card_caches()  # What every call paid before the template cache
+        start = time.perf_counter()
+        features.generate_id_card(sample_student(i, photo))
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, default=200)
+    args = parser.parse_args()
+
+    buffer = BytesIO()
+    Image.new('RGB', (600, 800), color=(180, 120, 90)).save(buffer, format='JPEG')
+    photo = buffer.getvalue()
+
+    features.generate_id_card(sample_student(0, photo))  # Warm imports and codecs
+    for label, cold in (("uncached", True), ("cached template", False)):
+        timings = measure(args.cards, photo, cold)
+        print(f"{label:16}: mean {statistics.mean(timings):6.2f} ms  "
+              f"p50 {statistics.median(timings):6.2f} ms  "
+              f"p95 {statistics.quantiles(timings, n=20)[18]:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Cohort grading: vectorized analytics vs a scalar Course.get_grade loop.
+
+Usage: python benchmarks/bench_grades.py [--students 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+import analytics  # noqa: E402
+import database  # noqa: E402
+from utils import Course  # noqa: E402
+
+
+def seed(students):
+    db = database.Database()
+    rng = random.Random(42)
+    slots = [row[0] for row in db.conn.execute("SELECT slot FROM teachers")]
+    db.conn.executemany(
+        "INSERT INTO students (username, password, name, roll_number, class, slot) VALUES (?, ?, ?, ?, ?, ?)",
+        ((f"user{i}", "pw", f"Student {i}", f"GIAIC-{i:07d}", "Batch 2024", rng.choice(slots)) for i in range(students)),
+    )
+    course_ids = [row[0] for row in db.conn.execute("SELECT id FROM courses")]
+    db.conn.executemany(
+        "INSERT INTO results (student_id, course_id, status, marks) SELECT id, ?, 'Graded', ? FROM students WHERE id = ?",
+        ((rng.choice(course_ids), rng.randrange(30, 101), i) for i in range(1, students + 1)),
+    )
+    db.conn.commit()
+    db.close()
+
+
+def scalar_report(columns):
+    """What batch reporting looks like one student at a time."""
+    course = Course("any")
+    passes, distribution, by_slot = 0, {}, {}
+    for mark, slot_code in zip(columns.marks.tolist(), columns.slot.tolist()):
+        grade = course.get_grade(int(mark))
+        distribution[grade] = distribution.get(grade, 0) + 1
+        passed = grade != "F"
+        passes += passed
+        slot = by_slot.setdefault(slot_code, [0, 0])
+        slot[0] += 1
+        slot[1] += passed
+    return passes / len(columns), distribution, by_slot
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        seed(args.students)
+
+        start = time.perf_counter()
+        columns = analytics.load_results()
+        load = time.perf_counter() - start
+
+        start = time.perf_counter()
+        report = analytics.summarize(columns)
+        vectorized = time.perf_counter() - start
+
+        start = time.perf_counter()
+        pass_rate, distribution, _ = scalar_report(columns)
+        scalar = time.perf_counter() - start
+        database.close_pool()
+
+    assert abs(pass_rate - report['pass_rate']) < 1e-12
+    assert {k: v for k, v in report['grade_distribution'].items() if v} == distribution
+    expected = [Course("any").get_grade(m) for m in range(0, 101)]
+    assert analytics.grades(np.arange(0, 101, dtype=float)).tolist() == expected
+
+    print(f"students={len(columns)}")
+    print(f"load (one query -> arrays) : {load * 1000:8.1f} ms")
+    print(f"vectorized summarize       : {vectorized * 1000:8.1f} ms")
+    print(f"scalar get_grade loop      : {scalar * 1000:8.1f} ms  ({scalar / vectorized:.0f}x slower)")
+
+
+if __name__ == "__main__":
+    main()
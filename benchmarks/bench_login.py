@@ -0,0 +1,83 @@
+"""Concurrent login throughput: per-call sqlite3.connect vs the pooled WAL layer.
+
+Usage: python benchmarks/bench_login.py [--users 2000] [--threads 16] [--logins 20000]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+LOGIN_SQL = "SELECT * FROM students WHERE username = ? AND password = ?"
+
+
+def seed(db_name, users):
+    database.DB_NAME = db_name
+    db = database.Database()
+    db.conn.executemany(
+        "INSERT INTO students (username, password, name, roll_number, class, slot, photo) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ((f"user{i}", f"pw{i}", f"Student {i}", f"GIAIC-{i:06d}", "Batch 2024", "Monday 2-5 PM", None) for i in range(users)),
+    )
+    db.conn.commit()
+    db.close()
+    database.close_pool()
+
+
+def legacy_login(db_name, i):
+    """The original get_db_connection(): connect, query, commit, close."""
+    conn = sqlite3.connect(db_name)
+    conn.row_factory = sqlite3.Row
+    try:
+        cursor = conn.cursor()
+        cursor.execute(LOGIN_SQL, (f"user{i}", f"pw{i}"))
+        row = cursor.fetchone()
+        conn.commit()
+        return row is not None
+    finally:
+        conn.close()
+
+
+def pooled_login(db_name, i):
+    with database.get_db_connection() as cursor:
+        cursor.execute(LOGIN_SQL, (f"user{i}", f"pw{i}"))
+        return cursor.fetchone() is not None
+
+
+def run(fn, db_name, users, threads, logins):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        ok = sum(pool.map(lambda n: fn(db_name, n % users), range(logins)))
+    elapsed = time.perf_counter() - start
+    assert ok == logins, f"{logins - ok} logins failed"
+    return logins / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--logins", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "bench.db")
+        seed(db_name, args.users)
+        database.DB_NAME = db_name
+
+        before = run(legacy_login, db_name, args.users, args.threads, args.logins)
+        after = run(pooled_login, db_name, args.users, args.threads, args.logins)
+        database.close_pool()
+
+    print(f"users={args.users} threads={args.threads} logins={args.logins}")
+    print(f"per-call connect : {before:10.0f} logins/sec")
+    print(f"pooled + WAL     : {after:10.0f} logins/sec  ({after / before:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
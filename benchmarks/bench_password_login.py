@@ -0,0 +1,67 @@
+"""Login latency with salted PBKDF2 hashes at N concurrent users.
+
+Every user logs in repeatedly from its own thread; verification runs on the
+bounded password pool. Reports p50/p99 end-to-end authenticate() latency.
+
+Usage: python benchmarks/bench_password_login.py [--users 32] [--logins 4] [--iterations 600000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+import passwords  # noqa: E402
+import queries  # noqa: E402
+
+
+def seed(users):
+    db = database.Database()
+    db.conn.executemany(
+        "INSERT INTO students (username, password, name, roll_number, class, slot) VALUES (?, ?, ?, ?, ?, ?)",
+        ((f"user{i}", passwords.hash_password(f"pw{i}"), f"Student {i}", f"GIAIC-{i:06d}", "Batch 2024", "Monday 2-5 PM")
+         for i in range(users)),
+    )
+    db.conn.commit()
+    db.close()
+
+
+def user_session(i, logins):
+    timings = []
+    for _ in range(logins):
+        start = time.perf_counter()
+        assert queries.authenticate(f"user{i}", f"pw{i}") is not None
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=32)
+    parser.add_argument("--logins", type=int, default=4, help="Logins per user")
+    parser.add_argument("--iterations", type=int, default=passwords.ITERATIONS)
+    args = parser.parse_args()
+    passwords.ITERATIONS = args.iterations
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        seed(args.users)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.users) as pool:
+            timings = [t for session in pool.map(user_session, range(args.users), [args.logins] * args.users) for t in session]
+        elapsed = time.perf_counter() - start
+        database.close_pool()
+
+    quantiles = statistics.quantiles(timings, n=100)
+    print(f"users={args.users} logins={len(timings)} iterations={args.iterations} workers={passwords.VERIFY_WORKERS}")
+    print(f"latency: p50 {quantiles[49]:.0f} ms  p99 {quantiles[98]:.0f} ms  max {max(timings):.0f} ms")
+    print(f"throughput: {len(timings) / elapsed:.1f} logins/sec")
+
+
+if __name__ == "__main__":
+    main()
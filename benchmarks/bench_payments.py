@@ -0,0 +1,88 @@
+"""Payment queue load test: settled intents/sec against a slow fake gateway.
+
+Several client threads submit payment intents (and re-submit some of their
+idempotency keys, like users mashing the Pay button) while the asyncio worker
+charges a FakeGateway with a fixed per-call latency. Compares the throughput
+with what calling the gateway synchronously, one payment at a time, would give.
+
+Usage: python benchmarks/bench_payments.py [--payments 2000] [--latency 0.3] [--concurrency 64]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+import payments  # noqa: E402
+
+
+def client(processor, keys, duplicate_rate, seed_value):
+    rng = random.Random(seed_value)
+    for key in keys:
+        processor.submit(rng.choice((10, 25, 50)), "tok_bench", key)
+        if rng.random() < duplicate_rate:
+            processor.submit(10, "tok_bench", key)
+
+
+def settled():
+    with database.get_db_connection() as cursor:
+        return cursor.execute("SELECT COUNT(*) FROM payment_intents WHERE status IN (?, ?)",
+                              payments.FINAL_STATUSES).fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--payments", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.3, help="Fake gateway seconds per call")
+    parser.add_argument("--concurrency", type=int, default=payments.MAX_CONCURRENCY)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--decline-rate", type=float, default=0.1)
+    parser.add_argument("--duplicate-rate", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        database.Database().close()
+        gateway = payments.FakeGateway(args.latency, args.decline_rate, args.error_rate, seed=args.seed)
+        processor = payments.PaymentProcessor(gateway, concurrency=args.concurrency, backoff=args.latency)
+        keys = [payments.new_idempotency_key() for _ in range(args.payments)]
+        threads = [threading.Thread(target=client, args=(processor, keys[n::args.clients], args.duplicate_rate, n))
+                   for n in range(args.clients)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        submit_elapsed = time.perf_counter() - start
+        while settled() < args.payments:
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - start
+        processor.close()
+        stats = processor.stats()
+        with database.get_db_connection() as cursor:
+            intents = cursor.execute("SELECT COUNT(*) FROM payment_intents").fetchone()[0]
+        database.close_pool()
+
+    print(f"payments={args.payments} clients={args.clients} concurrency={args.concurrency} "
+          f"gateway latency={args.latency * 1000:.0f} ms")
+    print(f"submitted      : {stats['submitted']} calls in {submit_elapsed:.2f} s "
+          f"({stats['submitted'] / submit_elapsed:,.0f} submits/sec, never waiting on the gateway)")
+    print(f"settled        : {args.payments} intents in {elapsed:.2f} s ({args.payments / elapsed:,.0f} intents/sec; "
+          f"synchronous would be ~{1 / args.latency:,.1f}/sec)")
+    print(f"intents        : {intents} for {args.payments} keys (duplicate submits reused their intent)")
+    print(f"outcomes       : {stats['succeeded']} succeeded, {stats['failed']} failed, {stats['retries']} retries")
+    print(f"gateway        : {gateway.calls} calls, {gateway.charges} distinct charges; "
+          f"p50 {stats['gateway_p50_ms']:.0f} ms  p99 {stats['gateway_p99_ms']:.0f} ms")
+    assert intents == args.payments, f"{intents} intents for {args.payments} idempotency keys"
+    assert stats['succeeded'] + stats['failed'] == args.payments, stats
+
+
+if __name__ == "__main__":
+    main()
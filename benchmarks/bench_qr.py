@@ -0,0 +1,49 @@
+"""QR generation cost: standard qrcode path vs the fast fixed-mask path vs a cache hit.
+
+All three produce the module mask that is cached; scaling it onto the card is not included.
+
+Usage: python benchmarks/bench_qr.py [--payloads 500]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import features  # noqa: E402
+
+
+def payloads(n):
+    return [features.qr_payload({'name': f"Student {i}", 'roll_no': f"GIAIC-{i:06d}",
+                                 'email': f"student{i}@example.com", 'course': "Python"})
+            for i in range(n)]
+
+
+def per_call_ms(fn, items):
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - start) * 1000 / len(items)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--payloads", type=int, default=500)
+    args = parser.parse_args()
+    items = payloads(args.payloads)
+
+    standard = per_call_ms(features._standard_qr, items)
+    fast = per_call_ms(features._fast_qr, items)
+    features.get_qr_modules.cache_clear()
+    for item in items:
+        features.get_qr_modules(item)
+    cached = per_call_ms(features.get_qr_modules, items)
+
+    print(f"standard path : {standard:8.3f} ms/QR")
+    print(f"fast path     : {fast:8.3f} ms/QR  ({standard / fast:.1f}x)")
+    print(f"cache hit     : {cached:8.3f} ms/QR  {features.get_qr_modules.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""Standard benchmark suite over a synthetic cohort, reported as JSON.
+
+Generates (or reuses) a cohort with benchmarks/synthetic.py and runs the
+standard scenarios against it:
+
+* login_storm - concurrent authenticate() calls through the password pool
+* bulk_import - CSV roster import into a fresh database
+* card_render - process-pool batch render of the first N students' cards
+* dashboard - per-student dashboard reads and the cohort result report
+* export - streaming CSV and columnar exports of every exportable table
+
+The JSON output records the environment, the cohort and one flat dict of
+numbers per scenario. Metric names carry their direction: `_per_sec` is
+better when higher, `_ms` and `_s` when lower (single-sample `max_*` values
+are too noisy to compare and are skipped). Pass a previous run with
+--compare to fail (exit 1) on any such metric that regressed by more than
+--tolerance.
+
+Usage: python benchmarks/suite.py [--students 10000] [--output run.json] [--compare baseline.json]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aggregates  # noqa: E402
+import analytics  # noqa: E402
+import card_batch  # noqa: E402
+import database  # noqa: E402
+import export  # noqa: E402
+import importer  # noqa: E402
+import passwords  # noqa: E402
+import queries  # noqa: E402
+import synthetic  # noqa: E402
+
+SUITE_VERSION = 1
+SCENARIOS = ('login_storm', 'bulk_import', 'card_render', 'dashboard', 'export')
+
+
+def _percentiles(timings_ms):
+    if len(timings_ms) < 2:
+        value = timings_ms[0] if timings_ms else 0.0
+        return {'p50_ms': value, 'p99_ms': value, 'max_ms': value}
+    quantiles = statistics.quantiles(timings_ms, n=100)
+    return {'p50_ms': quantiles[49], 'p99_ms': quantiles[98], 'max_ms': max(timings_ms)}
+
+
+def login_storm(args, students):
+    rng = random.Random(args.seed)
+    # Match the cohort's hash cost so successful logins never trigger a rehash write
+    stored = queries.fetch_one(queries.LOGIN_SQL, (synthetic.username(0),))['password']
+    passwords.ITERATIONS = int(stored.split('$')[1])
+    picks = [rng.randrange(students) for _ in range(args.users * args.logins)]
+
+    def login(i):
+        start = time.perf_counter()
+        try:
+            assert queries.authenticate(synthetic.username(i), synthetic.PASSWORD) is not None
+            busy = False
+        except passwords.PasswordPoolBusy:
+            busy = True
+        return (time.perf_counter() - start) * 1000, busy
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        outcomes = list(pool.map(login, picks))
+    elapsed = time.perf_counter() - start
+    timings = [ms for ms, _ in outcomes]
+    busy = sum(rejected for _, rejected in outcomes)
+    return {'users': args.users, 'logins': len(timings), 'iterations': passwords.ITERATIONS, 'busy': busy,
+            **_percentiles(timings), 'logins_per_sec': len(timings) / elapsed}
+
+
+def bulk_import(args, students):
+    cohort_db = database.DB_NAME
+    with tempfile.TemporaryDirectory() as tmp:
+        roster = os.path.join(tmp, "roster.csv")
+        synthetic.write_roster(roster, args.import_rows, start=students, seed=args.seed)
+        database.DB_NAME = os.path.join(tmp, "import.db")
+        database.Database().close()
+        try:
+            report = importer.import_roster(roster)
+        finally:
+            database.close_pool()
+            database.DB_NAME = cohort_db
+    return {'rows': report.read, 'inserted': report.inserted, 'elapsed_s': report.elapsed,
+            'rows_per_sec': report.rows_per_sec}
+
+
+def card_render(args, students):
+    with tempfile.TemporaryDirectory() as tmp:
+        rows = card_batch.iter_student_rows()
+        try:
+            report = card_batch.render_batch(islice(rows, args.cards), os.path.join(tmp, "cards.zip"),
+                                             workers=args.workers)
+        finally:
+            rows.close()
+    return {'cards': report.rendered, 'failed': len(report.failures), 'workers': args.workers or os.cpu_count(),
+            'elapsed_s': report.elapsed, 'cards_per_sec': report.cards_per_sec,
+            'peak_worker_rss_mb': report.peak_worker_rss_mb}
+
+
+def dashboard(args, students):
+    rng = random.Random(args.seed)
+    with database.get_db_connection() as cursor:
+        cursor.execute("SELECT MIN(id), MAX(id) FROM students")
+        low, high = cursor.fetchone()
+    timings = []
+    for _ in range(args.dashboard_reads):
+        student_id = rng.randint(low, high)
+        start = time.perf_counter()
+        aggregates.student_summary(student_id)
+        aggregates.course_statuses(student_id)
+        aggregates.slot_headcounts()
+        timings.append((time.perf_counter() - start) * 1000)
+    start = time.perf_counter()
+    report = analytics.result_report()
+    report_s = time.perf_counter() - start
+    return {'reads': len(timings), **_percentiles(timings), 'result_report_s': report_s,
+            'result_rows': report['students']}
+
+
+def export_tables(args, students):
+    metrics = {}
+    for table in export.EXPORTS:
+        for fmt in export.FORMATS:
+            written = 0
+            start = time.perf_counter()
+            for chunk in export.iter_export(table, fmt):
+                written += len(chunk)
+            elapsed = time.perf_counter() - start
+            metrics[f'{table}_{fmt}_s'] = elapsed
+            metrics[f'{table}_{fmt}_mb'] = written / 1e6
+    return metrics
+
+
+RUNNERS = {
+    'login_storm': login_storm,
+    'bulk_import': bulk_import,
+    'card_render': card_render,
+    'dashboard': dashboard,
+    'export': export_tables,
+}
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def regressions(current, baseline, tolerance):
+    """Returns (scenario, metric, baseline, current) for every directional metric worse by > tolerance."""
+    found = []
+    for scenario, metrics in current['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(scenario, {})
+        for name, value in metrics.items():
+            old = previous.get(name)
+            if not isinstance(old, (int, float)) or not old or name.startswith('max_'):
+                continue
+            if name.endswith('_per_sec'):
+                worse = value < old * (1 - tolerance)
+            elif name.endswith(('_ms', '_s')):
+                worse = value > old * (1 + tolerance)
+            else:
+                continue
+            if worse:
+                found.append((scenario, name, old, value))
+    return found
+
+
+def run(args, db_path):
+    generated = not os.path.exists(db_path)
+    cohort = None
+    if generated:
+        cohort = synthetic.generate_cohort(db_path, args.students, args.days, args.seed, args.iterations)
+    database.DB_NAME = db_path
+    database.Database().close()
+    with database.get_db_connection() as cursor:
+        counts = {table: cursor.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                  for table in ('students', 'attendance', 'results')}
+    cohort = cohort or {'students': counts['students'], 'seed': args.seed}
+    cohort['rows'] = counts
+    cohort['generated'] = generated
+
+    results = {
+        'suite_version': SUITE_VERSION,
+        'started': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'environment': environment(),
+        'cohort': cohort,
+        'scenarios': {},
+    }
+    for name in args.scenarios:
+        print(f"running {name}...", file=sys.stderr)
+        metrics = RUNNERS[name](args, counts['students'])
+        results['scenarios'][name] = {key: round(value, 3) if isinstance(value, float) else value
+                                      for key, value in metrics.items()}
+    database.close_pool()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=10000, help="Cohort size (1k to 1M)")
+    parser.add_argument("--days", type=int, default=20, help="Attendance days per student")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--iterations", type=int, default=None, help="PBKDF2 cost of the cohort's password hash")
+    parser.add_argument("--cohort-db", default=None,
+                        help="Reuse (or create and keep) this cohort database instead of a temporary one")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated subset to run")
+    parser.add_argument("--users", type=int, default=32, help="login_storm: concurrent users")
+    parser.add_argument("--logins", type=int, default=4, help="login_storm: logins per user")
+    parser.add_argument("--import-rows", type=int, default=100000, help="bulk_import: roster size")
+    parser.add_argument("--cards", type=int, default=500, help="card_render: cards to render")
+    parser.add_argument("--workers", type=int, default=None, help="card_render: worker processes")
+    parser.add_argument("--dashboard-reads", type=int, default=2000, help="dashboard: student page loads")
+    parser.add_argument("--output", default=None, help="Write the JSON here instead of stdout")
+    parser.add_argument("--compare", default=None, help="Baseline JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown")
+    args = parser.parse_args()
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    if args.cohort_db:
+        results = run(args, os.path.abspath(args.cohort_db))
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            results = run(args, os.path.join(tmp, "cohort.db"))
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for scenario, name, old, new in found:
+            print(f"REGRESSION {scenario}.{name}: {old} -> {new}", file=sys.stderr)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Synthetic cohort generator for benchmarks.
+
+Builds a database with the current schema (Database migrations) holding N
+students plus their attendance history and course results. Everything is
+derived from the seed, so the same arguments always produce the same data:
+students come from a seeded RNG, attendance and results from integer hashes
+of (student id, day/course) evaluated inside SQLite, which keeps a
+1M-student cohort to a couple of INSERT ... SELECT statements.
+
+All students share one password (PASSWORD), hashed once at the requested
+cost. One in PHOTO_EVERY students gets one of a few distinct photos, so the
+content-addressed photo store sees realistic dedupe.
+
+Usage: python benchmarks/synthetic.py cohort.db [--students 100000] [--days 20] [--seed 42]
+"""
+import argparse
+import csv
+import datetime
+import os
+import random
+import sys
+import time
+from io import BytesIO
+from itertools import islice
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image  # noqa: E402  # type: ignore
+
+import database  # noqa: E402
+import passwords  # noqa: E402
+import photos  # noqa: E402
+
+PASSWORD = "bench-password"
+FIRST_DAY = datetime.date(2026, 1, 5)
+PRESENT_PCT = 85  # Share of attendance rows marked present
+PHOTO_EVERY = 4
+DISTINCT_PHOTOS = 16
+CHUNK_SIZE = 10000
+
+FIRST_NAMES = ["Ayesha", "Ali", "Fatima", "Hamza", "Zainab", "Usman", "Maryam", "Bilal", "Hira", "Saad",
+               "Sana", "Ahmed", "Iqra", "Hassan", "Noor", "Omar"]
+LAST_NAMES = ["Khan", "Ahmed", "Malik", "Hussain", "Sheikh", "Siddiqui", "Qureshi", "Raza", "Butt", "Iqbal"]
+
+
+def username(i):
+    return f"user{i:07d}"
+
+
+def roll_number(i):
+    return f"GIAIC-{i:07d}"
+
+
+def _photo(index):
+    image = Image.new('RGB', (240, 320), ((index * 53) % 256, (index * 97) % 256, (index * 151) % 256))
+    data = BytesIO()
+    image.save(data, format='JPEG', quality=85)
+    return data.getvalue()
+
+
+def student_rows(students, slots, password_hash, photo_hashes, seed=42):
+    """Yields INSERT parameters for `students`, deterministically from the seed."""
+    rng = random.Random(seed)
+    for i in range(students):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        photo_hash = photo_hashes[i % len(photo_hashes)] if photo_hashes and i % PHOTO_EVERY == 0 else None
+        yield (username(i), password_hash, name, roll_number(i), f"Batch {2024 + i % 3}", rng.choice(slots), photo_hash)
+
+
+def roster_rows(count, start, seed=42):
+    """Yields roster dicts in the importer's column layout for students start..start+count-1."""
+    rng = random.Random(seed)
+    for i in range(start, start + count):
+        yield {
+            "username": username(i), "password": PASSWORD,
+            "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "roll_number": roll_number(i), "class": "Batch 2024", "slot": "Monday 2-5 PM",
+            "email": f"{username(i)}@example.com", "contact": f"0300{i:07d}",
+            "course": "Python", "favorite_teacher": "Sir Zia",
+        }
+
+
+def write_roster(path, count, start, seed=42):
+    """Writes a CSV roster of `count` new students for import benchmarks."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = None
+        for row in roster_rows(count, start, seed):
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=list(row))
+                writer.writeheader()
+            writer.writerow(row)
+
+
+def generate_cohort(db_path, students, days=20, seed=42, iterations=None):
+    """Creates (or appends to) the database at db_path and returns a description of the cohort."""
+    database.DB_NAME = db_path
+    start = time.perf_counter()
+    db = database.Database()
+    conn = db.conn
+    slots = [row[0] for row in conn.execute("SELECT slot FROM teachers ORDER BY id")]
+    first_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM students").fetchone()[0]
+
+    cursor = conn.cursor()
+    photo_hashes = [photos.store_photo(cursor, _photo(index)) for index in range(DISTINCT_PHOTOS)]
+    password_hash = passwords.hash_password(PASSWORD, iterations)
+    rows = student_rows(students, slots, password_hash, photo_hashes, seed)
+    while True:
+        chunk = list(islice(rows, CHUNK_SIZE))
+        if not chunk:
+            break
+        conn.executemany("INSERT INTO students (username, password, name, roll_number, class, slot, photo_hash) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?)", chunk)
+    conn.commit()
+
+    # Attendance: one row per student per class day, present unless the hash lands in the absent share
+    conn.execute('''
+        WITH RECURSIVE day(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM day WHERE n + 1 < ?),
+        class_day(student_id, date, h) AS (
+            SELECT s.id, date(?, '+' || day.n || ' days'), s.id * 7919 + day.n * 104729 + ?
+            FROM students s, day WHERE s.id >= ?
+        )
+        INSERT INTO attendance (student_id, date, status, time_in, time_out)
+        SELECT student_id, date,
+               CASE WHEN h % 100 < ? THEN 'present' ELSE 'absent' END,
+               CASE WHEN h % 100 < ? THEN date || printf(' 14:%02d:00', h % 30) END,
+               CASE WHEN h % 100 < ? THEN date || printf(' 17:%02d:00', h / 100 % 30) END
+        FROM class_day
+    ''', (days, FIRST_DAY.isoformat(), seed, first_id, PRESENT_PCT, PRESENT_PCT, PRESENT_PCT))
+    # Results: each student takes most courses; marks spread over 30-100
+    conn.execute('''
+        INSERT INTO results (student_id, course_id, status, marks)
+        SELECT s.id, c.id, 'Graded', 30 + (s.id * 31 + c.id * 17 + ?) % 71
+        FROM students s, courses c WHERE s.id >= ? AND (s.id + c.id + ?) % 4 != 0
+    ''', (seed, first_id, seed))
+    conn.commit()
+
+    counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+              for table in ('students', 'attendance', 'results', 'photos')}
+    db.close()
+    return {
+        'students': students, 'days': days, 'seed': seed,
+        'iterations': iterations or passwords.ITERATIONS,
+        'rows': counts, 'generate_s': round(time.perf_counter() - start, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic student cohort database.")
+    parser.add_argument("path")
+    parser.add_argument("--students", type=int, default=100000)
+    parser.add_argument("--days", type=int, default=20, help="Attendance days per student")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--iterations", type=int, default=None, help="PBKDF2 cost of the shared password hash")
+    args = parser.parse_args()
+
+    cohort = generate_cohort(args.path, args.students, args.days, args.seed, args.iterations)
+    database.close_pool()
+    print(f"{args.path}: {cohort['rows']} in {cohort['generate_s']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
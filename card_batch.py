@@ -0,0 +1,214 @@
+# card_batch.py
+"""Batch ID card rendering.
+
+Spreads features.generate_id_card across a process pool and streams the
+rendered cards into a ZIP of PNGs or a multi-page PDF. Only a bounded number
+of cards is in flight at a time, and a card that fails to render is recorded
+and skipped instead of killing the batch.
+
+Usage: python card_batch.py cards.zip [--format pdf] [--workers 4]
+"""
+import argparse
+import os
+import resource
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from database import get_pool
+from features import CARD_WIDTH, CARD_HEIGHT, generate_id_card
+
+FETCH_SIZE = 500
+IN_FLIGHT_PER_WORKER = 4  # Caps memory held by pending results
+
+STUDENT_CARD_SQL = '''
+    SELECT s.id, s.name, s.roll_number, s.class, s.slot, COALESCE(p.card_thumb, s.photo) AS photo, t.name AS teacher
+    FROM students s
+    LEFT JOIN teachers t ON t.slot = s.slot
+    LEFT JOIN photos p ON p.hash = s.photo_hash
+    ORDER BY s.id
+'''
+
+
+def iter_student_rows(fetch_size=FETCH_SIZE):
+    """Yields student rows joined with their slot teacher, fetching in batches."""
+    with get_pool().connection() as conn:
+        cursor = conn.execute(STUDENT_CARD_SQL)
+        try:
+            while True:
+                rows = cursor.fetchmany(fetch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
+
+def student_card_data(row):
+    """Maps a `students` row onto the dict generate_id_card expects."""
+    return {
+        'name': row['name'],
+        'roll_no': row['roll_number'],
+        'slot': row['slot'],
+        'course': row['class'],
+        'favorite_teacher': row['teacher'] or "N/A",
+        'photo': row['photo'],
+    }
+
+
+def _render(job):
+    """Worker entry point: returns (index, roll_no, bytes or None, error or None)."""
+    index, data, image_format = job
+    try:
+        return index, data['roll_no'], generate_id_card(data, image_format=image_format, fast_qr=True), None
+    except Exception as e:
+        return index, data['roll_no'], None, f"{type(e).__name__}: {e}"
+
+
+class ZipCardWriter:
+    """Writes each card as <roll_no>.png into a ZIP archive."""
+    image_format = 'PNG'
+
+    def __init__(self, path):
+        # PNGs are already deflated, so store them as-is
+        self.zip = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_STORED)
+        self.names = set()
+
+    def add(self, name, data):
+        filename = f"{name}.png"
+        if filename in self.names:
+            filename = f"{name}-{len(self.names)}.png"
+        self.names.add(filename)
+        self.zip.writestr(filename, data)
+
+    def close(self):
+        self.zip.close()
+
+
+class PdfCardWriter:
+    """Streams one JPEG card per page into a PDF without holding earlier pages in memory."""
+    image_format = 'JPEG'
+
+    def __init__(self, path, width=CARD_WIDTH, height=CARD_HEIGHT):
+        self.f = open(path, 'wb')
+        self.width, self.height = width, height
+        self.offsets = {}  # object number -> byte offset, for the xref table
+        self.page_ids = []
+        self.next_id = 3  # 1 is the catalog, 2 the page tree
+        self.f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _object(self, obj_id, body, stream=None):
+        self.offsets[obj_id] = self.f.tell()
+        self.f.write(f"{obj_id} 0 obj\n".encode() + body)
+        if stream is not None:
+            self.f.write(b"\nstream\n" + stream + b"\nendstream")
+        self.f.write(b"\nendobj\n")
+
+    def add(self, name, data):
+        image_id, content_id, page_id = self.next_id, self.next_id + 1, self.next_id + 2
+        self.next_id += 3
+        self._object(image_id, (f"<< /Type /XObject /Subtype /Image /Width {self.width} /Height {self.height} "
+                                f"/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /DCTDecode "
+                                f"/Length {len(data)} >>").encode(), data)
+        content = f"q {self.width} 0 0 {self.height} 0 0 cm /Im0 Do Q".encode()
+        self._object(content_id, f"<< /Length {len(content)} >>".encode(), content)
+        self._object(page_id, (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {self.width} {self.height}] "
+                               f"/Resources << /XObject << /Im0 {image_id} 0 R >> >> "
+                               f"/Contents {content_id} 0 R >>").encode())
+        self.page_ids.append(page_id)
+
+    def close(self):
+        self._object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        kids = " ".join(f"{page_id} 0 R" for page_id in self.page_ids)
+        self._object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>".encode())
+        xref_offset = self.f.tell()
+        self.f.write(f"xref\n0 {self.next_id}\n0000000000 65535 f \n".encode())
+        for obj_id in range(1, self.next_id):
+            self.f.write(f"{self.offsets[obj_id]:010d} 00000 n \n".encode())
+        self.f.write(f"trailer\n<< /Size {self.next_id} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+        self.f.close()
+
+
+WRITERS = {'zip': ZipCardWriter, 'pdf': PdfCardWriter}
+
+
+class BatchReport:
+    """Outcome of one batch render."""
+    def __init__(self):
+        self.rendered = 0
+        self.failures = []  # (roll_no, error)
+        self.elapsed = 0.0
+        self.peak_rss_mb = 0.0
+        self.peak_worker_rss_mb = 0.0
+
+    @property
+    def cards_per_sec(self):
+        return self.rendered / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return (f"rendered={self.rendered} failed={len(self.failures)} elapsed={self.elapsed:.2f}s "
+                f"cards/sec={self.cards_per_sec:.1f} peak_rss={self.peak_rss_mb:.0f}MB "
+                f"peak_worker_rss={self.peak_worker_rss_mb:.0f}MB")
+
+
+def _max_rss_mb(who):
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+def render_batch(rows, out_path, out_format='zip', workers=None):
+    """Renders a card for each student row into out_path and returns a BatchReport.
+
+    Results are consumed in submission order so PDF pages follow the input order.
+    """
+    workers = workers or os.cpu_count() or 1
+    writer = WRITERS[out_format](out_path)
+    report = BatchReport()
+    start = time.perf_counter()
+    max_in_flight = workers * IN_FLIGHT_PER_WORKER
+
+    def collect(future):
+        _, roll_no, data, error = future.result()
+        if error:
+            report.failures.append((roll_no, error))
+        else:
+            writer.add(roll_no or "card", data)
+            report.rendered += 1
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for index, row in enumerate(rows):
+                job = (index, student_card_data(row), writer.image_format)
+                pending.append(pool.submit(_render, job))
+                if len(pending) >= max_in_flight:
+                    collect(pending.popleft())
+            while pending:
+                collect(pending.popleft())
+    finally:
+        writer.close()
+
+    report.elapsed = time.perf_counter() - start
+    report.peak_rss_mb = _max_rss_mb(resource.RUSAGE_SELF)
+    report.peak_worker_rss_mb = _max_rss_mb(resource.RUSAGE_CHILDREN)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render ID cards for every student into a ZIP or PDF.")
+    parser.add_argument("out_path")
+    parser.add_argument("--format", choices=sorted(WRITERS), default=None,
+                        help="Defaults to the out_path extension")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    out_format = args.format or ('pdf' if args.out_path.lower().endswith('.pdf') else 'zip')
+    report = render_batch(iter_student_rows(), args.out_path, out_format, args.workers)
+    print(report.summary())
+    for roll_no, error in report.failures[:20]:
+        print(f"  {roll_no}: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# card_cache.py
+"""Persistent cache of rendered ID cards.
+
+Each card is stored under an ETag: a SHA-256 over the card-relevant student
+fields, the photo's hash and the template version (render version, layout
+and font file). Editing any of them yields a new ETag, so the next view
+re-renders while repeat views and downloads are served straight from
+SQLite. Entries are evicted least-recently-used once the cache grows past
+MAX_CACHE_BYTES. Lookups are timed as card_cache.hit / card_cache.miss in the
+metrics registry; cache_stats() adds the counters and size for the Admin page.
+"""
+import hashlib
+import json
+import threading
+import time
+
+from database import get_db_connection
+from features import CARD_RENDER_VERSION, DEFAULT_LAYOUT, font_stamp, generate_id_card
+from metrics import observe
+from photos import photo_hash
+
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+TOUCH_INTERVAL = 60  # Seconds; refresh last_used at most this often to keep hits read-only
+EVICT_CHUNK = 1000  # Most entries one eviction statement removes
+
+# Both read only idx_card_cache_lru (last_used, size), never the image pages.
+TOTAL_SIZE_SQL = "SELECT COALESCE(SUM(size), 0) FROM card_cache"
+# Deletes the least recently used entries until ?1 bytes are freed, in one statement
+EVICT_SQL = '''
+    DELETE FROM card_cache WHERE rowid IN (
+        SELECT rowid FROM (
+            SELECT rowid, SUM(size) OVER (ORDER BY last_used ROWS UNBOUNDED PRECEDING) - size AS freed_before
+            FROM card_cache ORDER BY last_used LIMIT ?2
+        ) WHERE freed_before < ?1
+    )
+    RETURNING size
+'''
+
+# Fields generate_id_card draws; anything else in student_data does not affect the image
+CARD_FIELDS = ('name', 'roll_no', 'email', 'slot', 'contact', 'course', 'favorite_teacher', 'time_in', 'time_out')
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+
+def template_version(layout=DEFAULT_LAYOUT):
+    return [CARD_RENDER_VERSION, list(layout), font_stamp(layout.font_path)]
+
+
+def card_etag(student_data, image_format='PNG', layout=DEFAULT_LAYOUT):
+    """Returns the cache key for the card these inputs would render."""
+    fields = {key: str(student_data[key]) for key in CARD_FIELDS if student_data.get(key) is not None}
+    photo = student_data.get('photo_hash') or (photo_hash(student_data['photo']) if student_data.get('photo') else None)
+    payload = json.dumps([fields, photo, image_format, template_version(layout)], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _count(key, amount=1):
+    with _stats_lock:
+        _stats[key] += amount
+
+
+def get_cached_card(etag):
+    """Returns the cached image for an ETag, or None."""
+    now = time.time()
+    with get_db_connection() as cursor:
+        cursor.execute("SELECT image, last_used FROM card_cache WHERE etag = ?", (etag,))
+        row = cursor.fetchone()
+        if row and now - row['last_used'] > TOUCH_INTERVAL:
+            cursor.execute("UPDATE card_cache SET last_used = ? WHERE etag = ?", (now, etag))
+    return row['image'] if row else None
+
+
+def _evict(cursor, max_bytes):
+    cursor.execute(TOTAL_SIZE_SQL)
+    excess = cursor.fetchone()[0] - max_bytes
+    while excess > 0:
+        cursor.execute(EVICT_SQL, (excess, EVICT_CHUNK))
+        freed = [row['size'] for row in cursor.fetchall()]
+        if not freed:
+            break
+        excess -= sum(freed)
+        _count('evictions', len(freed))
+
+
+def store_card(etag, image, max_bytes=None):
+    with get_db_connection() as cursor:
+        cursor.execute("INSERT OR REPLACE INTO card_cache (etag, image, size, last_used) VALUES (?, ?, ?, ?)",
+                       (etag, image, len(image), time.time()))
+        _evict(cursor, max_bytes or MAX_CACHE_BYTES)
+
+
+def get_card(student_data, image_format='PNG', layout=DEFAULT_LAYOUT):
+    """Returns (etag, image bytes), rendering and caching the card only on a miss."""
+    start = time.perf_counter()
+    etag = card_etag(student_data, image_format, layout)
+    image = get_cached_card(etag)
+    if image is not None:
+        _count('hits')
+        observe('card_cache.hit', time.perf_counter() - start)
+        return etag, image
+    _count('misses')
+    image = generate_id_card(student_data, image_format=image_format, layout=layout)
+    store_card(etag, image)
+    observe('card_cache.miss', time.perf_counter() - start)  # Includes the render and the store
+    return etag, image
+
+
+def cache_stats():
+    """Process-wide hit/miss/eviction counters plus the cache's current size."""
+    with get_db_connection() as cursor:
+        cursor.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM card_cache")
+        entries, size = cursor.fetchone()
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats.update(entries=entries, bytes=size, hit_rate=stats['hits'] / lookups if lookups else 0.0)
+    return stats
+
+
+def clear_card_cache():
+    with get_db_connection() as cursor:
+        cursor.execute("DELETE FROM card_cache")
@@ -1,17 +1,221 @@
 import sqlite3
+import queue
+import threading
 from contextlib import contextmanager
-import streamlit as st # type: ignore # Import st for displaying info in setup_database
+from metrics import timed
+import streamlit as st # type: ignore # For st.cache_resource in setup_database
 
 DB_NAME = 'student_portal.db'
 
+# Connection tuning applied to every pooled connection
+POOL_SIZE = 8
+POOL_TIMEOUT = 10.0  # Seconds to wait for a free connection before giving up
+STATEMENT_CACHE_SIZE = 256  # Prepared statements kept per connection
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",  # Readers no longer block the writer
+    "PRAGMA synchronous = NORMAL",  # Safe with WAL, avoids an fsync per commit
+    "PRAGMA cache_size = -16000",  # ~16 MB page cache per connection
+    "PRAGMA mmap_size = 134217728",  # 128 MB memory-mapped reads
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",  # Wait on locks instead of failing immediately
+    "PRAGMA foreign_keys = ON",  # Enforce REFERENCES: writes naming a missing parent row now fail
+)
+
+
+# Per-thread count of statements the app executes. Streamlit runs each rerun on
+# one script thread, so resetting at the top of main() yields queries per rerun.
+# Counted per execute()/executemany() call rather than with a trace callback,
+# which also reports trigger and FTS5 shadow-table sub-statements.
+_query_counts = threading.local()
+_UNCOUNTED = ("BEGIN", "COMMIT", "ROLLBACK", "PRAGMA", "SAVEPOINT", "RELEASE")
+
+def _count_statement(sql):
+    if not sql.lstrip().upper().startswith(_UNCOUNTED):
+        _query_counts.value = getattr(_query_counts, 'value', 0) + 1
+
+class _CountingCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        _count_statement(sql)
+        return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        _count_statement(sql)
+        return super().executemany(sql, seq_of_parameters)
+
+class _CountingConnection(sqlite3.Connection):
+    # Connection.execute() runs its statement without going through Cursor.execute()
+    def cursor(self, factory=_CountingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        _count_statement(sql)
+        return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        _count_statement(sql)
+        return super().executemany(sql, seq_of_parameters)
+
+def query_count():
+    """Statements executed on the current thread since the last reset."""
+    return getattr(_query_counts, 'value', 0)
+
+def reset_query_count():
+    _query_counts.value = 0
+
+
+def _connect(db_name):
+    """Opens a new tuned connection to the given database file."""
+    conn = sqlite3.connect(db_name, check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE,
+                           factory=_CountingConnection)
+    conn.row_factory = sqlite3.Row # Allows accessing columns by name
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+class ConnectionPool:
+    """A bounded pool of reusable SQLite connections.
+
+    Connections are created lazily up to `size` and handed out LIFO so the
+    most recently used (warmest) connection and its statement cache are reused.
+    """
+    def __init__(self, db_name=DB_NAME, size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        self.db_name = db_name
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._lock = threading.Lock()
+        self._created = 0
+        self._closed = False
+
+    def acquire(self):
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection pool is closed.")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return _connect(self.db_name)
+                except Exception:
+                    self._created -= 1
+                    raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(f"No database connection available after {self.timeout}s.")
+
+    def release(self, conn):
+        if self._closed:
+            conn.close()
+            return
+        if conn.in_transaction:
+            conn.rollback()  # Never hand out a connection mid-transaction
+        self._idle.put_nowait(conn)
+
+    @contextmanager
+    def connection(self):
+        with timed('db.pool_wait'):
+            conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        self._created = 0
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Returns the process-wide connection pool, (re)creating it if DB_NAME changed."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.db_name != DB_NAME:
+            if _pool is not None:
+                _pool.close()
+            _pool = ConnectionPool(DB_NAME)
+        return _pool
+
+def close_pool():
+    """Closes every idle pooled connection (e.g. on shutdown or in benchmarks)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
 class Database:
+    """Owns the schema. Opening a Database applies any pending migrations.
+
+    The instance holds one pooled connection until close(). Messages meant for
+    the user (e.g. the seeded test account) are collected in `notices` rather
+    than shown, since migrations also run outside Streamlit.
+    """
     def __init__(self):
-        self.conn = sqlite3.connect(DB_NAME, check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row # Allows accessing columns by name
-        self.create_tables()
+        self.pool = get_pool()
+        self.conn = self.pool.acquire()
+        self.notices = []
+        self.migrate()
+
+    # Ordered schema steps; step N brings a database to PRAGMA user_version N.
+    # Append new steps, never reorder or edit shipped ones. Every step is
+    # idempotent so databases created before versioning can replay them.
+    MIGRATIONS = (
+        'create_tables',
+        'seed_defaults',
+        'add_photo_store',
+        'add_student_indexes',
+        'add_faqs',
+        'add_attendance_times',
+        'add_result_marks',
+        'add_dashboard_aggregates',
+        'add_card_cache',
+        'add_search',
+        'add_payment_intents',
+        'prune_empty_aggregates',
+        'hash_plaintext_passwords',
+        'add_payment_leases',
+        'placeholder_pending_profiles',
+        'add_card_cache_lru_index',
+    )
+    SCHEMA_VERSION = len(MIGRATIONS)
 
-    def create_tables(self):
+    def schema_version(self):
+        return self.conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def migrate(self):
+        """Runs the migrations newer than the stored schema version. Returns the steps applied."""
+        if self.schema_version() >= self.SCHEMA_VERSION:
+            return [] # Up to date: no DDL, no seeding
+        applied = []
         cursor = self.conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE") # Serialize concurrent bootstraps across processes
+        try:
+            version = self.schema_version() # Another process may have migrated meanwhile
+            for number, step in enumerate(self.MIGRATIONS[version:], start=version + 1):
+                getattr(self, step)(cursor)
+                cursor.execute(f"PRAGMA user_version = {number}")
+                applied.append(step)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return applied
+
+    def create_tables(self, cursor):
         # Students table - now includes username, password, and photo for ID card
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS students (
@@ -22,7 +226,7 @@ class Database:
                 roll_number TEXT UNIQUE NOT NULL, -- Ensure roll numbers are unique
                 class TEXT NOT NULL,
                 slot TEXT NOT NULL,
-                photo BLOB -- Stores image as binary data
+                photo BLOB -- Legacy inline image; new uploads go to photos via photo_hash
             )
         ''')
         # Teachers table
@@ -63,54 +267,405 @@ class Database:
                 UNIQUE(student_id, date) -- One attendance record per student per day
             )
         ''')
-        self.conn.commit()
+
+    def seed_defaults(self, cursor):
+        # Insert default student user if not exists
+        cursor.execute("SELECT id FROM students WHERE username = ?", ('student',))
+        if not cursor.fetchone():
+            cursor.execute("INSERT INTO students (username, password, name, roll_number, class, slot, photo) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                           ('student', 'student123', 'Default Student User', 'GIAIC-DSU-001', 'Batch 2024', 'Monday 2-5 PM', None))
+            self.notices.append("Default student account 'student'/'student123' created for testing.")
+
+        # Insert default courses (if not exists)
+        cursor.execute("INSERT OR IGNORE INTO courses (name) VALUES ('Typescript')")
+        cursor.execute("INSERT OR IGNORE INTO courses (name) VALUES ('Next.js')")
+        cursor.execute("INSERT OR IGNORE INTO courses (name) VALUES ('Python')")
+        cursor.execute("INSERT OR IGNORE INTO courses (name) VALUES ('Agentic AI')")
+
+        # Insert default teachers with unique slots (if not exists)
+        cursor.execute("INSERT OR IGNORE INTO teachers (name, slot) VALUES ('Sir Zia', 'Monday 2-5 PM')")
+        cursor.execute("INSERT OR IGNORE INTO teachers (name, slot) VALUES ('Sir Asharib', 'Tuesday 2-5 PM')")
+        cursor.execute("INSERT OR IGNORE INTO teachers (name, slot) VALUES ('Sir Ali Aftab', 'Wednesday 2-5 PM')")
+        cursor.execute("INSERT OR IGNORE INTO teachers (name, slot) VALUES ('Sir Aneeq', 'Thursday 2-5 PM')")
+        cursor.execute("INSERT OR IGNORE INTO teachers (name, slot) VALUES ('Sir Hamzah Syed', 'Friday 2-5 PM')")
+        cursor.execute("INSERT OR IGNORE INTO teachers (name, slot) VALUES ('Sir Ali Aftab', 'Saturday 2-5 PM')")
+        cursor.execute("INSERT OR IGNORE INTO teachers (name, slot) VALUES ('Sir Muhammad Bilal Khan', 'Sunday 2-5 PM')")
+
+    def add_photo_store(self, cursor):
+        # Photos table - content-addressed by SHA-256 so identical uploads are stored once.
+        # Thumbnails are precomputed on upload so reads never decode the original.
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS photos (
+                hash TEXT PRIMARY KEY, -- SHA-256 hex digest of the original bytes
+                original BLOB NOT NULL,
+                card_thumb BLOB NOT NULL, -- Exactly the ID card photo size
+                display_thumb BLOB NOT NULL, -- Small preview for pages
+                created_at TEXT NOT NULL DEFAULT (datetime('now'))
+            )
+        ''')
+        self._add_column(cursor, 'students', 'photo_hash', 'TEXT REFERENCES photos(hash)')
+        from photos import migrate_inline_photos  # Imported here; photos depends on this module
+        migrate_inline_photos(cursor)
+
+    def add_student_indexes(self, cursor):
+        # Covering index for slot rosters; username/roll_number lookups use their UNIQUE indexes
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_students_slot ON students (slot, name, roll_number)")
+
+    def add_faqs(self, cursor):
+        # FAQs table - questions shown per course (or 'General') on the FAQs page
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS faqs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                topic TEXT NOT NULL,
+                question TEXT NOT NULL,
+                UNIQUE(topic, question)
+            )
+        ''')
+        cursor.executemany("INSERT OR IGNORE INTO faqs (topic, question) VALUES (?, ?)", [
+            ('Typescript', 'What are the benefits of using TypeScript?'),
+            ('Typescript', 'How does TypeScript relate to JavaScript?'),
+            ('Typescript', 'What are interfaces and types in TypeScript?'),
+            ('Next.js', 'What is Next.js and what is it used for?'),
+            ('Next.js', 'What are the key features of Next.js?'),
+            ('Next.js', 'How does routing work in Next.js?'),
+            ('Python', 'What are the basic data types in Python?'),
+            ('Python', 'How do you define functions in Python?'),
+            ('Python', 'What are some popular libraries in Python?'),
+            ('General', 'How do I register for a course?'),
+            ('General', 'What if I forget my password?'),
+            ('General', 'Who should I contact for technical support?'),
+        ])
+
+    def add_attendance_times(self, cursor):
+        # Check-in/out times printed on the ID card, written by attendance.py
+        self._add_column(cursor, 'attendance', 'time_in', 'TEXT')
+        self._add_column(cursor, 'attendance', 'time_out', 'TEXT')
+
+    def add_result_marks(self, cursor):
+        # Numeric marks graded by analytics.py; status stays for results without marks
+        self._add_column(cursor, 'results', 'marks', 'INTEGER')
+
+    def add_dashboard_aggregates(self, cursor):
+        # Summary tables read by the dashboard, kept current by the triggers below
+        # so a page view reads O(1) rows per student instead of scanning history.
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS student_attendance_stats (
+                student_id INTEGER PRIMARY KEY REFERENCES students(id),
+                days_recorded INTEGER NOT NULL DEFAULT 0,
+                days_present INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS student_result_stats (
+                student_id INTEGER PRIMARY KEY REFERENCES students(id),
+                courses INTEGER NOT NULL DEFAULT 0,
+                passed INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS slot_headcounts (
+                slot TEXT PRIMARY KEY,
+                students INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        from aggregates import RESULT_PASSED_SQL as passed, rebuild_aggregates  # Imported here; aggregates depends on this module
+        triggers = {
+            'trg_attendance_insert': '''
+                AFTER INSERT ON attendance BEGIN
+                    INSERT INTO student_attendance_stats (student_id, days_recorded, days_present)
+                    VALUES (NEW.student_id, 1, NEW.status = 'present')
+                    ON CONFLICT(student_id) DO UPDATE SET
+                        days_recorded = days_recorded + 1, days_present = days_present + excluded.days_present;
+                END''',
+            'trg_attendance_update': '''
+                AFTER UPDATE OF student_id, status ON attendance BEGIN
+                    UPDATE student_attendance_stats SET days_recorded = days_recorded - 1,
+                        days_present = days_present - (OLD.status = 'present') WHERE student_id = OLD.student_id;
+                    INSERT INTO student_attendance_stats (student_id, days_recorded, days_present)
+                    VALUES (NEW.student_id, 1, NEW.status = 'present')
+                    ON CONFLICT(student_id) DO UPDATE SET
+                        days_recorded = days_recorded + 1, days_present = days_present + excluded.days_present;
+                END''',
+            'trg_attendance_delete': '''
+                AFTER DELETE ON attendance BEGIN
+                    UPDATE student_attendance_stats SET days_recorded = days_recorded - 1,
+                        days_present = days_present - (OLD.status = 'present') WHERE student_id = OLD.student_id;
+                END''',
+            'trg_results_insert': f'''
+                AFTER INSERT ON results BEGIN
+                    INSERT INTO student_result_stats (student_id, courses, passed)
+                    VALUES (NEW.student_id, 1, {passed.format(r='NEW')})
+                    ON CONFLICT(student_id) DO UPDATE SET
+                        courses = courses + 1, passed = passed + excluded.passed;
+                END''',
+            'trg_results_update': f'''
+                AFTER UPDATE OF student_id, status, marks ON results BEGIN
+                    UPDATE student_result_stats SET courses = courses - 1,
+                        passed = passed - {passed.format(r='OLD')} WHERE student_id = OLD.student_id;
+                    INSERT INTO student_result_stats (student_id, courses, passed)
+                    VALUES (NEW.student_id, 1, {passed.format(r='NEW')})
+                    ON CONFLICT(student_id) DO UPDATE SET
+                        courses = courses + 1, passed = passed + excluded.passed;
+                END''',
+            'trg_results_delete': f'''
+                AFTER DELETE ON results BEGIN
+                    UPDATE student_result_stats SET courses = courses - 1,
+                        passed = passed - {passed.format(r='OLD')} WHERE student_id = OLD.student_id;
+                END''',
+            'trg_students_slot_insert': '''
+                AFTER INSERT ON students BEGIN
+                    INSERT INTO slot_headcounts (slot, students) VALUES (NEW.slot, 1)
+                    ON CONFLICT(slot) DO UPDATE SET students = students + 1;
+                END''',
+            'trg_students_slot_update': '''
+                AFTER UPDATE OF slot ON students WHEN OLD.slot IS NOT NEW.slot BEGIN
+                    UPDATE slot_headcounts SET students = students - 1 WHERE slot = OLD.slot;
+                    INSERT INTO slot_headcounts (slot, students) VALUES (NEW.slot, 1)
+                    ON CONFLICT(slot) DO UPDATE SET students = students + 1;
+                END''',
+            'trg_students_slot_delete': '''
+                AFTER DELETE ON students BEGIN
+                    UPDATE slot_headcounts SET students = students - 1 WHERE slot = OLD.slot;
+                END''',
+        }
+        for name, body in triggers.items():
+            cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+        rebuild_aggregates(cursor)
+
+    def add_card_cache(self, cursor):
+        # Rendered ID cards keyed by an ETag of everything that affects the image (see card_cache.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS card_cache (
+                etag TEXT PRIMARY KEY,
+                image BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL -- Unix time, drives LRU eviction
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_card_cache_last_used ON card_cache (last_used)")
+
+    def add_search(self, cursor):
+        # Course feedback, previously discarded by the feedback page
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS feedback (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                student_id INTEGER NOT NULL REFERENCES students(id),
+                course_id INTEGER NOT NULL REFERENCES courses(id),
+                text TEXT NOT NULL,
+                created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_feedback_course ON feedback (course_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_feedback_student ON feedback (student_id)")
+        # External-content FTS5 indexes: the text lives once in the base table and
+        # the triggers below keep the index in step with every write (see search.py).
+        # prefix='2 3' adds prefix indexes so short "abc*" queries avoid a term scan.
+        indexes = {
+            'students_fts': ('students', ('name', 'roll_number', 'slot')),
+            'courses_fts': ('courses', ('name',)),
+            'feedback_fts': ('feedback', ('text',)),
+        }
+        for fts, (table, columns) in indexes.items():
+            column_list = ', '.join(columns)
+            new_values = ', '.join(f"NEW.{column}" for column in columns)
+            old_values = ', '.join(f"OLD.{column}" for column in columns)
+            cursor.execute(f'''
+                CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                    {column_list}, content='{table}', content_rowid='id', prefix='2 3'
+                )
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{fts}_insert AFTER INSERT ON {table} BEGIN
+                    INSERT INTO {fts} (rowid, {column_list}) VALUES (NEW.id, {new_values});
+                END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{fts}_delete AFTER DELETE ON {table} BEGIN
+                    INSERT INTO {fts} ({fts}, rowid, {column_list}) VALUES ('delete', OLD.id, {old_values});
+                END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{fts}_update AFTER UPDATE OF {column_list} ON {table} BEGIN
+                    INSERT INTO {fts} ({fts}, rowid, {column_list}) VALUES ('delete', OLD.id, {old_values});
+                    INSERT INTO {fts} (rowid, {column_list}) VALUES (NEW.id, {new_values});
+                END
+            ''')
+            cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")  # Index rows that predate the triggers
+
+    def add_payment_intents(self, cursor):
+        # Payments requested from the UI and settled by the background worker (see payments.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS payment_intents (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                idempotency_key TEXT NOT NULL UNIQUE,
+                student_id INTEGER REFERENCES students(id),
+                amount REAL NOT NULL,
+                token TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending'
+                    CHECK (status IN ('pending', 'processing', 'succeeded', 'failed')),
+                message TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL, -- Unix time; retries are pushed back by the backoff
+                created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_payment_intents_due ON payment_intents (status, next_attempt_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_payment_intents_student ON payment_intents (student_id)")
+
+    def prune_empty_aggregates(self, cursor):
+        # The add_dashboard_aggregates triggers left zeroed stats rows behind, and
+        # their REFERENCES students(id) then blocked deleting the student. These
+        # versions drop a row once its last base row is gone.
+        from aggregates import RESULT_PASSED_SQL as passed  # Imported here; aggregates depends on this module
+        triggers = {
+            'trg_attendance_update': '''
+                AFTER UPDATE OF student_id, status ON attendance BEGIN
+                    UPDATE student_attendance_stats SET days_recorded = days_recorded - 1,
+                        days_present = days_present - (OLD.status = 'present') WHERE student_id = OLD.student_id;
+                    DELETE FROM student_attendance_stats WHERE student_id = OLD.student_id AND days_recorded = 0;
+                    INSERT INTO student_attendance_stats (student_id, days_recorded, days_present)
+                    VALUES (NEW.student_id, 1, NEW.status = 'present')
+                    ON CONFLICT(student_id) DO UPDATE SET
+                        days_recorded = days_recorded + 1, days_present = days_present + excluded.days_present;
+                END''',
+            'trg_attendance_delete': '''
+                AFTER DELETE ON attendance BEGIN
+                    UPDATE student_attendance_stats SET days_recorded = days_recorded - 1,
+                        days_present = days_present - (OLD.status = 'present') WHERE student_id = OLD.student_id;
+                    DELETE FROM student_attendance_stats WHERE student_id = OLD.student_id AND days_recorded = 0;
+                END''',
+            'trg_results_update': f'''
+                AFTER UPDATE OF student_id, status, marks ON results BEGIN
+                    UPDATE student_result_stats SET courses = courses - 1,
+                        passed = passed - {passed.format(r='OLD')} WHERE student_id = OLD.student_id;
+                    DELETE FROM student_result_stats WHERE student_id = OLD.student_id AND courses = 0;
+                    INSERT INTO student_result_stats (student_id, courses, passed)
+                    VALUES (NEW.student_id, 1, {passed.format(r='NEW')})
+                    ON CONFLICT(student_id) DO UPDATE SET
+                        courses = courses + 1, passed = passed + excluded.passed;
+                END''',
+            'trg_results_delete': f'''
+                AFTER DELETE ON results BEGIN
+                    UPDATE student_result_stats SET courses = courses - 1,
+                        passed = passed - {passed.format(r='OLD')} WHERE student_id = OLD.student_id;
+                    DELETE FROM student_result_stats WHERE student_id = OLD.student_id AND courses = 0;
+                END''',
+            'trg_students_slot_update': '''
+                AFTER UPDATE OF slot ON students WHEN OLD.slot IS NOT NEW.slot BEGIN
+                    UPDATE slot_headcounts SET students = students - 1 WHERE slot = OLD.slot;
+                    DELETE FROM slot_headcounts WHERE slot = OLD.slot AND students = 0;
+                    INSERT INTO slot_headcounts (slot, students) VALUES (NEW.slot, 1)
+                    ON CONFLICT(slot) DO UPDATE SET students = students + 1;
+                END''',
+            'trg_students_slot_delete': '''
+                AFTER DELETE ON students BEGIN
+                    UPDATE slot_headcounts SET students = students - 1 WHERE slot = OLD.slot;
+                    DELETE FROM slot_headcounts WHERE slot = OLD.slot AND students = 0;
+                END''',
+        }
+        for name, body in triggers.items():
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(f"CREATE TRIGGER {name} {body}")
+        cursor.execute("DELETE FROM student_attendance_stats WHERE days_recorded = 0")
+        cursor.execute("DELETE FROM student_result_stats WHERE courses = 0")
+        cursor.execute("DELETE FROM slot_headcounts WHERE students = 0")
+
+    def hash_plaintext_passwords(self, cursor):
+        # Rows from before hashing, the seeded test account and early bulk imports
+        # still held plaintext; hash them at the import tier (upgraded on login).
+        from passwords import ALGORITHM, IMPORT_ITERATIONS, get_password_pool
+        cursor.execute("SELECT id, password FROM students WHERE password NOT LIKE ?", (ALGORITHM + '$%',))
+        rows = cursor.fetchall()
+        hashes = get_password_pool().hash_many([row['password'] for row in rows], IMPORT_ITERATIONS)
+        cursor.executemany("UPDATE students SET password = ? WHERE id = ?",
+                           ((password_hash, row['id']) for row, password_hash in zip(rows, hashes)))
+
+    def add_payment_leases(self, cursor):
+        # A claim is a lease owned by one worker (see payments.py), replacing the
+        # blanket re-queue of every 'processing' intent on startup
+        self._add_column(cursor, 'payment_intents', 'claimed_by', 'TEXT')
+        self._add_column(cursor, 'payment_intents', 'lease_expires_at', 'REAL') # Unix time
+        cursor.execute("UPDATE payment_intents SET lease_expires_at = 0 WHERE status = 'processing'") # Unowned: take over
+        cursor.execute("UPDATE payment_intents SET token = '' WHERE status IN ('succeeded', 'failed')") # No tokens at rest
+
+    def placeholder_pending_profiles(self, cursor):
+        # Registration stored roll_number = '' (UNIQUE, so only the first account
+        # ever succeeded) and slot = '' (counted as a slot). Pending accounts get
+        # a unique placeholder roll number and are left out of the headcounts.
+        from queries import PENDING_ROLL_PREFIX  # Imported here; queries depends on this module
+        triggers = {
+            'trg_students_slot_insert': '''
+                AFTER INSERT ON students WHEN NEW.slot <> '' BEGIN
+                    INSERT INTO slot_headcounts (slot, students) VALUES (NEW.slot, 1)
+                    ON CONFLICT(slot) DO UPDATE SET students = students + 1;
+                END''',
+            'trg_students_slot_update': '''
+                AFTER UPDATE OF slot ON students WHEN OLD.slot IS NOT NEW.slot BEGIN
+                    UPDATE slot_headcounts SET students = students - 1 WHERE slot = OLD.slot;
+                    DELETE FROM slot_headcounts WHERE slot = OLD.slot AND students = 0;
+                    INSERT INTO slot_headcounts (slot, students) SELECT NEW.slot, 1 WHERE NEW.slot <> ''
+                    ON CONFLICT(slot) DO UPDATE SET students = students + 1;
+                END''',
+        }
+        for name, body in triggers.items():
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(f"CREATE TRIGGER {name} {body}")
+        cursor.execute("DELETE FROM slot_headcounts WHERE slot = ''")
+        cursor.execute("UPDATE students SET roll_number = ? || lower(hex(randomblob(8))) WHERE roll_number = ''",
+                       (PENDING_ROLL_PREFIX,))
+
+    def add_card_cache_lru_index(self, cursor):
+        # Covers eviction (see card_cache.py): size is stored after the image, so
+        # reading it from the table walks every cached image's overflow pages
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_card_cache_lru ON card_cache (last_used, size)")
+        cursor.execute("DROP INDEX IF EXISTS idx_card_cache_last_used") # A prefix of the new index
+
+    @staticmethod
+    def _add_column(cursor, table, column, definition):
+        """Adds a column to an existing table unless it is already there."""
+        cursor.execute(f"PRAGMA table_info({table})")
+        if column not in {row['name'] for row in cursor.fetchall()}:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
 
     def close(self):
-        self.conn.close()
+        if self.conn is not None:
+            self.pool.release(self.conn)
+            self.conn = None
+
+
+_notices_lock = threading.Lock()
 
-# Global instance to ensure single DB connection
-_db_instance = None
+@st.cache_resource
+def _get_database(db_name):
+    # Kept in Streamlit's resource cache, which survives script reruns and
+    # module reloads, so a rerun never repeats the migration check.
+    db = Database()
+    db.close() # Migrated; give the whole pool back to the app
+    return db
 
 def setup_database():
-    """Initializes the database and creates tables if they don't exist."""
-    global _db_instance
-    if _db_instance is None:
-        _db_instance = Database()
-        # Insert default student user if not exists
-        with get_db_connection() as cursor:
-            cursor.execute("SELECT id FROM students WHERE username = ?", ('student',))
-            if not cursor.fetchone():
-                cursor.execute("INSERT INTO students (username, password, name, roll_number, class, slot, photo) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                               ('student', 'student123', 'Default Student User', 'GIAIC-DSU-001', 'Batch 2024', 'Monday 2-5 PM', None))
-                st.info("Default student account 'student'/'student123' created for testing.")
-            
-            # Insert default courses (if not exists)
-            cursor.execute("INSERT OR IGNORE INTO courses (name) VALUES ('Typescript')")
-            cursor.execute("INSERT OR IGNORE INTO courses (name) VALUES ('Next.js')")
-            cursor.execute("INSERT OR IGNORE INTO courses (name) VALUES ('Python')")
-            cursor.execute("INSERT OR IGNORE INTO courses (name) VALUES ('Agentic AI')")
-
-            # Insert default teachers with unique slots (if not exists)
-            cursor.execute("INSERT OR IGNORE INTO teachers (name, slot) VALUES ('Sir Zia', 'Monday 2-5 PM')")
-            cursor.execute("INSERT OR IGNORE INTO teachers (name, slot) VALUES ('Sir Asharib', 'Tuesday 2-5 PM')")
-            cursor.execute("INSERT OR IGNORE INTO teachers (name, slot) VALUES ('Sir Ali Aftab', 'Wednesday 2-5 PM')")
-            cursor.execute("INSERT OR IGNORE INTO teachers (name, slot) VALUES ('Sir Aneeq', 'Thursday 2-5 PM')")
-            cursor.execute("INSERT OR IGNORE INTO teachers (name, slot) VALUES ('Sir Hamzah Syed', 'Friday 2-5 PM')")
-            cursor.execute("INSERT OR IGNORE INTO teachers (name, slot) VALUES ('Sir Ali Aftab', 'Saturday 2-5 PM')")
-            cursor.execute("INSERT OR IGNORE INTO teachers (name, slot) VALUES ('Sir Muhammad Bilal Khan', 'Sunday 2-5 PM')")
+    """Creates and migrates the schema on first use. Returns the migration notices.
+
+    The Database is cached across reruns and sessions, so only the first
+    caller after a migration gets its notices; everyone else gets [].
+    """
+    db = _get_database(DB_NAME)
+    with _notices_lock:
+        notices, db.notices = db.notices, []
+    return notices
 
 
 @contextmanager
 def get_db_connection():
-    """Provides a database connection and cursor, handling commit/rollback."""
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    try:
-        yield cursor
-        conn.commit()
-    except Exception as e:
-        conn.rollback()
-        raise e
-    finally:
-        conn.close()
\ No newline at end of file
+    """Provides a pooled database connection and cursor, handling commit/rollback."""
+    with get_pool().connection() as conn, timed('db.transaction'):
+        cursor = conn.cursor()
+        try:
+            yield cursor
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cursor.close()
@@ -0,0 +1,235 @@
+# export.py
+"""Streaming exports of students, attendance and results.
+
+Rows are read with fetchmany cursors and encoded batch by batch, so memory
+stays flat no matter how long the attendance history is. Two formats:
+
+* CSV - one header line, then one line per row.
+* Columnar ("PCOL") - a compact binary layout: after the magic bytes and a
+  JSON schema, the file is a sequence of row groups. Each group stores every
+  column contiguously (null bitmap, then little-endian int64/float64 values
+  or length-prefixed UTF-8/bytes), zlib-compressed and size-prefixed so
+  readers can skip the columns they do not need. A zero row count ends the
+  file. read_columnar() decodes it.
+
+Photos are only exported when asked for. Password hashes are never exported.
+
+Usage: python export.py attendance attendance.pcol [--format columnar] [--include-photos]
+"""
+import argparse
+import base64
+import csv
+import io
+import json
+import struct
+import zlib
+
+import numpy as np
+
+from database import get_pool
+
+FETCH_SIZE = 5000  # Rows per fetchmany and per columnar row group
+
+MAGIC = b"PCOL\x01"
+COMPRESSION_LEVEL = 1  # Fast; similar values sit next to each other, so even level 1 shrinks columns a lot
+INT, REAL, TEXT, BLOB = 'int', 'real', 'text', 'blob'
+
+# table -> (columns as (name, type, SQL expression), FROM clause)
+EXPORTS = {
+    'students': ([
+        ('id', INT, 's.id'),
+        ('username', TEXT, 's.username'),
+        ('name', TEXT, 's.name'),
+        ('roll_number', TEXT, 's.roll_number'),
+        ('class', TEXT, 's.class'),
+        ('slot', TEXT, 's.slot'),
+        ('photo_hash', TEXT, 's.photo_hash'),
+    ], 'students s ORDER BY s.id'),
+    'attendance': ([
+        ('id', INT, 'a.id'),
+        ('student_id', INT, 'a.student_id'),
+        ('roll_number', TEXT, 's.roll_number'),
+        ('date', TEXT, 'a.date'),
+        ('status', TEXT, 'a.status'),
+        ('time_in', TEXT, 'a.time_in'),
+        ('time_out', TEXT, 'a.time_out'),
+    ], 'attendance a JOIN students s ON s.id = a.student_id ORDER BY a.id'),
+    'results': ([
+        ('id', INT, 'r.id'),
+        ('student_id', INT, 'r.student_id'),
+        ('roll_number', TEXT, 's.roll_number'),
+        ('course', TEXT, 'c.name'),
+        ('status', TEXT, 'r.status'),
+        ('marks', INT, 'r.marks'),
+    ], 'results r JOIN students s ON s.id = r.student_id JOIN courses c ON c.id = r.course_id ORDER BY r.id'),
+}
+PHOTO_COLUMN = ('photo', BLOB, 'COALESCE(p.original, s.photo)')
+PHOTO_JOIN = 'students s LEFT JOIN photos p ON p.hash = s.photo_hash ORDER BY s.id'
+
+FORMATS = {'csv': ('text/csv', 'csv'), 'columnar': ('application/octet-stream', 'pcol')}
+
+
+def export_spec(table, include_photos=False):
+    """Returns (columns, SELECT statement) for an exportable table."""
+    if table not in EXPORTS:
+        raise ValueError(f"Unknown export table {table!r}; choose from {', '.join(EXPORTS)}")
+    columns, source = EXPORTS[table]
+    if include_photos and table == 'students':
+        columns, source = columns + [PHOTO_COLUMN], PHOTO_JOIN
+    select = ", ".join(f"{expr} AS {name}" for name, _, expr in columns)
+    return columns, f"SELECT {select} FROM {source}"
+
+
+def iter_batches(table, include_photos=False, fetch_size=FETCH_SIZE):
+    """Yields lists of row tuples, fetch_size at a time."""
+    _, sql = export_spec(table, include_photos)
+    with get_pool().connection() as conn:
+        cursor = conn.execute(sql)
+        cursor.row_factory = None  # Plain tuples
+        try:
+            while True:
+                rows = cursor.fetchmany(fetch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+
+
+def iter_csv(table, include_photos=False, fetch_size=FETCH_SIZE):
+    """Yields the CSV export as UTF-8 byte chunks. Blobs are base64 encoded."""
+    columns, _ = export_spec(table, include_photos)
+    blob_indexes = [i for i, (_, kind, _) in enumerate(columns) if kind == BLOB]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _, _ in columns])
+    for rows in iter_batches(table, include_photos, fetch_size):
+        if blob_indexes:
+            rows = [tuple(base64.b64encode(v).decode('ascii') if i in blob_indexes and v is not None else v
+                          for i, v in enumerate(row)) for row in rows]
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _encode_column(values, kind):
+    nulls = np.packbits(np.fromiter((v is None for v in values), dtype=bool, count=len(values)))
+    if kind == INT:
+        data = np.array([0 if v is None else int(v) for v in values], dtype='<i8').tobytes()
+    elif kind == REAL:
+        data = np.array([0.0 if v is None else float(v) for v in values], dtype='<f8').tobytes()
+    else:
+        items = [b'' if v is None else (v if isinstance(v, bytes) else str(v).encode('utf-8')) for v in values]
+        data = np.array([len(item) for item in items], dtype='<u4').tobytes() + b''.join(items)
+    chunk = zlib.compress(nulls.tobytes() + data, COMPRESSION_LEVEL)
+    return struct.pack('<I', len(chunk)) + chunk
+
+
+def iter_columnar(table, include_photos=False, fetch_size=FETCH_SIZE):
+    """Yields the columnar (PCOL) export as byte chunks, one row group at a time."""
+    columns, _ = export_spec(table, include_photos)
+    schema = json.dumps({'table': table, 'columns': [{'name': n, 'type': k} for n, k, _ in columns]}).encode('utf-8')
+    yield MAGIC + struct.pack('<I', len(schema)) + schema
+    for rows in iter_batches(table, include_photos, fetch_size):
+        group = [struct.pack('<I', len(rows))]
+        for index, column in enumerate(zip(*rows)):
+            group.append(_encode_column(column, columns[index][1]))
+        yield b''.join(group)
+    yield struct.pack('<I', 0)
+
+
+def _read_exact(f, size):
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError("Truncated PCOL file")
+    return data
+
+
+def _decode_column(chunk, kind, count):
+    chunk = zlib.decompress(chunk)
+    mask_size = (count + 7) // 8
+    nulls = np.unpackbits(np.frombuffer(chunk[:mask_size], dtype=np.uint8), count=count).astype(bool)
+    body = chunk[mask_size:]
+    if kind in (INT, REAL):
+        values = np.frombuffer(body, dtype='<i8' if kind == INT else '<f8', count=count).tolist()
+    else:
+        lengths = np.frombuffer(body[:4 * count], dtype='<u4')
+        ends = np.cumsum(lengths, dtype=np.int64) + 4 * count
+        starts = ends - lengths
+        values = [body[s:e] if kind == BLOB else body[s:e].decode('utf-8') for s, e in zip(starts.tolist(), ends.tolist())]
+    return [None if null else value for null, value in zip(nulls.tolist(), values)]
+
+
+def read_columnar(f, columns=None):
+    """Yields (schema, {column: values}) per row group from a PCOL file object.
+
+    Pass `columns` to decode only those columns; the rest are skipped unread.
+    """
+    if _read_exact(f, len(MAGIC)) != MAGIC:
+        raise ValueError("Not a PCOL file")
+    schema = json.loads(_read_exact(f, struct.unpack('<I', _read_exact(f, 4))[0]))
+    while True:
+        count = struct.unpack('<I', _read_exact(f, 4))[0]
+        if count == 0:
+            return
+        group = {}
+        for column in schema['columns']:
+            size = struct.unpack('<I', _read_exact(f, 4))[0]
+            if columns is not None and column['name'] not in columns:
+                f.seek(size, io.SEEK_CUR)
+                continue
+            group[column['name']] = _decode_column(_read_exact(f, size), column['type'], count)
+        yield schema, group
+
+
+def iter_export(table, fmt='csv', include_photos=False, fetch_size=FETCH_SIZE):
+    if fmt == 'csv':
+        return iter_csv(table, include_photos, fetch_size)
+    if fmt == 'columnar':
+        return iter_columnar(table, include_photos, fetch_size)
+    raise ValueError(f"Unknown export format {fmt!r}; choose from {', '.join(FORMATS)}")
+
+
+def export_to_file(f, table, fmt='csv', include_photos=False):
+    """Streams an export into a binary file object and returns the bytes written."""
+    written = 0
+    for chunk in iter_export(table, fmt, include_photos):
+        f.write(chunk)
+        written += len(chunk)
+    return written
+
+
+def deferred_export(table, fmt='csv', include_photos=False):
+    """Returns a callable for st.download_button's deferred `data`.
+
+    Nothing runs until the user clicks. Streamlit then needs the whole file
+    as bytes and keeps it in its in-memory media store, so the download is
+    not streamed: it costs the export's full size in memory. Use the CLI
+    (or export_to_file) for exports too large for that.
+    """
+    def build():
+        f = io.BytesIO()
+        export_to_file(f, table, fmt, include_photos)
+        return f.getvalue()
+    return build
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a table export to CSV or columnar (PCOL).")
+    parser.add_argument("table", choices=sorted(EXPORTS))
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=sorted(FORMATS), default=None, help="Defaults to the path extension")
+    parser.add_argument("--include-photos", action="store_true", help="Add original photos to the students export")
+    args = parser.parse_args()
+
+    fmt = args.format or ('columnar' if args.path.endswith('.pcol') else 'csv')
+    with open(args.path, 'wb') as f:
+        written = export_to_file(f, args.table, fmt, args.include_photos)
+    print(f"Wrote {written:,} bytes to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
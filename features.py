@@ -1,10 +1,15 @@
 # features.py
+import os
 import random
 import datetime
+from collections import namedtuple
+from functools import lru_cache
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont  # type: ignore
 import qrcode  # type: ignore
 from io import BytesIO
 import streamlit as st  # type: ignore
+from metrics import timed
 
 # --- Payment Gateway (Dummy - Replace with a real integration) ---
 def process_payment(amount, token):
@@ -25,53 +30,78 @@ def process_payment(amount, token):
 
 
 # --- ID Card Generation ---
-def generate_id_card(student_data):
-    """Generates the student ID card image.
+CARD_WIDTH, CARD_HEIGHT = 800, 500
 
-    Args:
-        student_data (dict): Dictionary containing student information.
-    """
-    width, height = 800, 500
+BLUE = (0, 71, 171)
+BLACK = (0, 0, 0)
 
-    img = Image.new('RGB', (width, height), color='white')
-    draw = ImageDraw.Draw(img)
+# Everything that shapes the static part of the card. Changing any field
+# produces a different template cache key, so stale templates are never reused.
+CardLayout = namedtuple('CardLayout', ['width', 'height', 'font_path', 'title', 'watermark'])
+DEFAULT_LAYOUT = CardLayout(CARD_WIDTH, CARD_HEIGHT, "arial.ttf", "GIAIC Student ID Card", "Q3")
+
+# Bump whenever generate_id_card draws differently, so cached renders are discarded
+CARD_RENDER_VERSION = 1
+
+CardFonts = namedtuple('CardFonts', ['title', 'header', 'text', 'watermark'])
 
-    font_path = "arial.ttf"
+LOGO_X, LOGO_Y, LOGO_SIZE = 50, 80, 100
+PHOTO_WIDTH, PHOTO_HEIGHT = 120, 160
+
+
+def font_stamp(font_path):
+    """Identifies the current version of a font file so edits invalidate the caches."""
     try:
-        title_font = ImageFont.truetype(font_path, 40)
-        header_font = ImageFont.truetype(font_path, 24)
-        text_font = ImageFont.truetype(font_path, 20)
-        q3_font = ImageFont.truetype(font_path, 100)
+        stat = os.stat(font_path)
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return None
+
+
+@lru_cache(maxsize=8)
+def _load_fonts(font_path, font_stamp):
+    try:
+        return CardFonts(
+            ImageFont.truetype(font_path, 40),
+            ImageFont.truetype(font_path, 24),
+            ImageFont.truetype(font_path, 20),
+            ImageFont.truetype(font_path, 100),
+        )
     except Exception as e:
         st.error(f"Error loading font '{font_path}': {e}. Please place the font file in the working directory or specify a valid path.")
-        # Use default font as fallback
-        title_font = ImageFont.load_default()
-        header_font = ImageFont.load_default()
-        text_font = ImageFont.load_default()
-        q3_font = ImageFont.load_default()
         st.warning("Using default font; ID card appearance may differ.")
+        default = ImageFont.load_default()
+        return CardFonts(default, default, default, default)
+
+
+def get_card_fonts(font_path):
+    """Returns the process-wide cached fonts for a font file."""
+    return _load_fonts(font_path, font_stamp(font_path))
+
+
+@lru_cache(maxsize=8)
+def _card_template(layout, font_stamp):
+    width, height = layout.width, layout.height
+    fonts = _load_fonts(layout.font_path, font_stamp)
+
+    img = Image.new('RGB', (width, height), color='white')
+    draw = ImageDraw.Draw(img)
 
-    blue = (0, 71, 171)
-    black = (0, 0, 0)
     border_width = 5
-    draw.rectangle([(0, 0), (width - 1, height - 1)], outline=blue, width=border_width)
+    draw.rectangle([(0, 0), (width - 1, height - 1)], outline=BLUE, width=border_width)
 
-    title_text = "GIAIC Student ID Card"
     try:
-        title_width = draw.textlength(title_text, font=title_font)
+        title_width = draw.textlength(layout.title, font=fonts.title)
     except AttributeError:
-        title_width = draw.textbbox((0, 0), title_text, font=title_font)[2]
+        title_width = draw.textbbox((0, 0), layout.title, font=fonts.title)[2]
     title_x = (width - title_width) / 2
-    draw.text((title_x, 20), title_text, fill=blue, font=title_font)
+    draw.text((title_x, 20), layout.title, fill=BLUE, font=fonts.title)
 
-    logo_width, logo_height = 100, 100
-    logo_x, logo_y = 50, 80
-    logo_img = Image.new('RGB', (logo_width, logo_height), color=blue)
-    img.paste(logo_img, (logo_x, logo_y))
+    logo_img = Image.new('RGB', (LOGO_SIZE, LOGO_SIZE), color=BLUE)
+    img.paste(logo_img, (LOGO_X, LOGO_Y))
 
-    q3_text = "Q3"
     try:
-        q3_bbox = draw.textbbox((0, 0), q3_text, font=q3_font)
+        q3_bbox = draw.textbbox((0, 0), layout.watermark, font=fonts.watermark)
         q3_width = q3_bbox[2] - q3_bbox[0]
         q3_height = q3_bbox[3] - q3_bbox[1]
     except Exception:
@@ -83,67 +113,155 @@ def generate_id_card(student_data):
 
     watermark_img = Image.new('RGBA', (width, height), (0, 0, 0, 0))
     watermark_draw = ImageDraw.Draw(watermark_img)
-    watermark_draw.text((q3_x, q3_y), q3_text, fill=(200, 200, 200, 128), font=q3_font)
+    watermark_draw.text((q3_x, q3_y), layout.watermark, fill=(200, 200, 200, 128), font=fonts.watermark)
+
+    return Image.alpha_composite(img.convert('RGBA'), watermark_img).convert('RGB')
+
+
+def get_card_template(layout=DEFAULT_LAYOUT):
+    """Returns the cached, pre-composited static card for a layout.
+
+    The image is shared; callers must draw on a copy.
+    """
+    return _card_template(layout, font_stamp(layout.font_path))
+
+
+def clear_card_caches():
+    """Drops cached fonts and templates, e.g. after replacing the font file in place."""
+    _load_fonts.cache_clear()
+    _card_template.cache_clear()
+
+
+def qr_payload(student_data):
+    """The text encoded in a card's QR code."""
+    return f"Name: {student_data.get('name', '')}, Roll No: {student_data.get('roll_no', '')}, Email: {student_data.get('email', '')}, Course: {student_data.get('course', '')}"
 
-    img = Image.alpha_composite(img.convert('RGBA'), watermark_img).convert('RGB')
 
-    start_x = logo_x + logo_width + 20
-    start_y = logo_y
+QR_BOX_SIZE, QR_BORDER = 10, 5
+# Entries are one pixel per module, well under 1 KB each, so a full cache
+# stays below ~4 MB per process (Streamlit server and each card_batch worker)
+QR_CACHE_SIZE = 4096
+
+
+def _module_mask(qr):
+    """The QR's module matrix (border included) as a 1-bit image, dark modules set."""
+    qr.make(fit=True)
+    matrix = np.array(qr.get_matrix(), dtype=np.uint8) * 255
+    return Image.fromarray(matrix, mode='L').convert('1')
+
+
+def _standard_qr(payload):
+    qr = qrcode.QRCode(version=1, box_size=QR_BOX_SIZE, border=QR_BORDER)
+    qr.add_data(payload)
+    return _module_mask(qr)
+
+
+def _fast_qr(payload):
+    """Bulk path: fixed error correction and mask pattern.
+
+    Fixing the mask skips scoring all eight candidate patterns.
+    """
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_L,
+                       box_size=QR_BOX_SIZE, border=QR_BORDER, mask_pattern=0)
+    qr.add_data(payload)
+    return _module_mask(qr)
+
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+def get_qr_modules(payload, fast=False):
+    """Returns the 1-bit module mask for a QR payload, cached per payload.
+
+    Cached masks are shared, so callers must not draw on them; see
+    scale_qr_mask for the card-sized mask.
+    """
+    if fast:
+        return _fast_qr(payload)
+    return _standard_qr(payload)
+
+
+def scale_qr_mask(modules):
+    """Scales a module mask to QR_BOX_SIZE pixels per module, ready to paste the card colour through."""
+    return modules.resize((modules.width * QR_BOX_SIZE, modules.height * QR_BOX_SIZE), Image.NEAREST)
+
+
+@timed('card.render')
+def generate_id_card(student_data, image_format='PNG', layout=DEFAULT_LAYOUT, fast_qr=False):
+    """Generates the student ID card image.
+
+    The border, title, logo and watermark come from a cached template; only the
+    per-student photo, text fields, QR code and times are drawn here. Each phase
+    is timed under card.* in the metrics registry.
+
+    Args:
+        student_data (dict): Dictionary containing student information.
+        image_format (str): Encoding of the returned bytes, e.g. 'PNG' or 'JPEG'.
+        layout (CardLayout): Static layout and font configuration.
+        fast_qr (bool): Use the faster fixed-mask QR path (bulk renders).
+    """
+    width, height = layout.width, layout.height
+    with timed('card.fonts'):
+        fonts = get_card_fonts(layout.font_path)
+    with timed('card.template'):
+        img = get_card_template(layout).copy()
+    draw = ImageDraw.Draw(img)
+
+    start_x = LOGO_X + LOGO_SIZE + 20
+    start_y = LOGO_Y
     line_height = 30
 
-    photo_width, photo_height = 120, 160
+    photo_width, photo_height = PHOTO_WIDTH, PHOTO_HEIGHT
     photo_x = width - photo_width - 50
     photo_y = 80
 
-    if student_data.get('photo'):
-        try:
-            student_photo = Image.open(BytesIO(student_data['photo']))
-            student_photo = student_photo.resize((photo_width, photo_height))
-            img.paste(student_photo, (photo_x, photo_y))
-        except Exception as e:
-            st.warning(f"Could not load student photo: {e}")
-            draw.rectangle([photo_x, photo_y, photo_x + photo_width, photo_y + photo_height], outline=blue, fill=blue)
-            draw.text((photo_x + 10, photo_y + 60), "Photo", fill=black, font=text_font)
-    else:
-        draw.rectangle([photo_x, photo_y, photo_x + photo_width, photo_y + photo_height], outline=blue, fill=blue)
-        draw.text((photo_x + 10, photo_y + 60), "No Photo", fill=black, font=text_font)
-
-    # Text fields
-    fields = [
-        ("Name:", 'name'),
-        ("Roll No:", 'roll_no'),
-        ("Email:", 'email'),
-        ("Slot:", 'slot'),
-        ("Contact:", 'contact'),
-        ("Course:", 'course'),
-        ("Teacher:", 'favorite_teacher'),
-    ]
-
-    for i, (label, key) in enumerate(fields):
-        draw.text((start_x, start_y + i * line_height), label, fill=black, font=header_font)
-        draw.text((start_x + 150, start_y + i * line_height), student_data.get(key, "N/A"), fill=black, font=text_font)
-
-    qr_data = f"Name: {student_data.get('name', '')}, Roll No: {student_data.get('roll_no', '')}, Email: {student_data.get('email', '')}, Course: {student_data.get('course', '')}"
-    qr = qrcode.QRCode(version=1, box_size=10, border=5)
-    qr.add_data(qr_data)
-    qr.make(fit=True)
-    qr_img = qr.make_image(fill_color=blue, back_color="white")
+    with timed('card.composite'):
+        if student_data.get('photo'):
+            try:
+                student_photo = Image.open(BytesIO(student_data['photo']))
+                if student_photo.size != (photo_width, photo_height):  # Stored card thumbnails are already sized
+                    student_photo = student_photo.resize((photo_width, photo_height))
+                img.paste(student_photo, (photo_x, photo_y))
+            except Exception as e:
+                st.warning(f"Could not load student photo: {e}")
+                draw.rectangle([photo_x, photo_y, photo_x + photo_width, photo_y + photo_height], outline=BLUE, fill=BLUE)
+                draw.text((photo_x + 10, photo_y + 60), "Photo", fill=BLACK, font=fonts.text)
+        else:
+            draw.rectangle([photo_x, photo_y, photo_x + photo_width, photo_y + photo_height], outline=BLUE, fill=BLUE)
+            draw.text((photo_x + 10, photo_y + 60), "No Photo", fill=BLACK, font=fonts.text)
+
+        # Text fields
+        fields = [
+            ("Name:", 'name'),
+            ("Roll No:", 'roll_no'),
+            ("Email:", 'email'),
+            ("Slot:", 'slot'),
+            ("Contact:", 'contact'),
+            ("Course:", 'course'),
+            ("Teacher:", 'favorite_teacher'),
+        ]
+
+        for i, (label, key) in enumerate(fields):
+            draw.text((start_x, start_y + i * line_height), label, fill=BLACK, font=fonts.header)
+            draw.text((start_x + 150, start_y + i * line_height), student_data.get(key, "N/A"), fill=BLACK, font=fonts.text)
 
-    qr_width, qr_height = qr_img.size
-    qr_x = width - qr_width - 50
-    qr_y = height - qr_height - 250
-    img.paste(qr_img, (qr_x, qr_y))
+    with timed('card.qr'):
+        qr_mask = scale_qr_mask(get_qr_modules(qr_payload(student_data), fast=fast_qr))
+        qr_width, qr_height = qr_mask.size
+        qr_x = width - qr_width - 50
+        qr_y = height - qr_height - 250
+        img.paste('white', (qr_x, qr_y, qr_x + qr_width, qr_y + qr_height))
+        img.paste(BLUE, (qr_x, qr_y), qr_mask)
 
     # Time in / out display
     time_in = student_data.get('time_in')
     time_out = student_data.get('time_out')
     if time_in:
         time_in_str = time_in if isinstance(time_in, str) else time_in.strftime('%Y-%m-%d %H:%M:%S')
-        draw.text((50, height - 80), f"Time In: {time_in_str}", fill=black, font=text_font)
+        draw.text((50, height - 80), f"Time In: {time_in_str}", fill=BLACK, font=fonts.text)
     if time_out:
         time_out_str = time_out if isinstance(time_out, str) else time_out.strftime('%Y-%m-%d %H:%M:%S')
-        draw.text((50, height - 50), f"Time Out: {time_out_str}", fill=black, font=text_font)
+        draw.text((50, height - 50), f"Time Out: {time_out_str}", fill=BLACK, font=fonts.text)
 
     img_bytes = BytesIO()
-    img.save(img_bytes, format='PNG')
+    with timed('card.encode'):
+        img.save(img_bytes, format=image_format)
     return img_bytes.getvalue()
@@ -0,0 +1,176 @@
+# importer.py
+"""Bulk student roster import.
+
+Streams a CSV or JSONL roster row by row, validates each row with
+utils.validate_input and writes the valid ones into `students` in chunked
+executemany transactions. Memory stays constant regardless of file size.
+Passwords are hashed per chunk on the shared password pool at the cheaper
+IMPORT_ITERATIONS tier; each account is upgraded to full cost on first login.
+
+Usage: python importer.py roster.csv [--chunk-size 5000] [--iterations 10000]
+"""
+import argparse
+import csv
+import json
+import sqlite3
+import time
+from itertools import islice
+
+from database import get_pool, setup_database
+from passwords import IMPORT_ITERATIONS, get_password_pool
+from utils import validate_input
+
+CHUNK_SIZE = 5000
+MAX_KEPT_ERRORS = 1000  # Only the first N errors are kept; all of them are counted
+
+INSERT_SQL = "INSERT INTO students (username, password, name, roll_number, class, slot, photo) VALUES (?, ?, ?, ?, ?, ?, ?)"
+
+# Roster columns. The last four are validated but not stored in `students`.
+REQUIRED_COLUMNS = ("username", "password", "name", "roll_number", "class", "slot",
+                    "email", "contact", "course", "favorite_teacher")
+
+
+class ImportReport:
+    """Counters and a bounded error sample for one import run."""
+    def __init__(self):
+        self.read = 0
+        self.inserted = 0
+        self.invalid = 0
+        self.duplicates = 0
+        self.errors = []  # (line_number, message), capped at MAX_KEPT_ERRORS
+        self.elapsed = 0.0
+
+    def add_error(self, line_number, message):
+        if len(self.errors) < MAX_KEPT_ERRORS:
+            self.errors.append((line_number, message))
+
+    @property
+    def rows_per_sec(self):
+        return self.read / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return (f"read={self.read} inserted={self.inserted} invalid={self.invalid} "
+                f"duplicates={self.duplicates} elapsed={self.elapsed:.2f}s rows/sec={self.rows_per_sec:,.0f}")
+
+
+def read_roster(path):
+    """Yields (line_number, row) from a .csv or .jsonl/.ndjson roster, one row at a time.
+
+    A JSONL line that is not valid JSON is yielded as its JSONDecodeError, so
+    validate_row can report it without stopping the import.
+    """
+    if path.endswith((".jsonl", ".ndjson")):
+        with open(path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                if line.strip():
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        row = e
+                    yield line_number, row
+    else:
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+
+
+def validate_row(row):
+    """Returns an error message for a roster row, or None if it can be inserted."""
+    if isinstance(row, json.JSONDecodeError):
+        return f"Invalid JSON: {row.msg} (column {row.colno})"
+    if not isinstance(row, dict):
+        return f"Expected a JSON object, got {type(row).__name__}"
+    missing = [column for column in REQUIRED_COLUMNS if row.get(column) is None]
+    if missing:
+        return f"Missing columns: {', '.join(missing)}"
+    fields = {column: str(row[column]) for column in REQUIRED_COLUMNS}
+    if not fields["username"].strip() or not fields["password"]:
+        return "Please enter a username and password."
+    if not fields["class"].strip():
+        return "Please enter a class."
+    return validate_input(fields["name"], fields["roll_number"], fields["email"], fields["slot"],
+                          fields["contact"], fields["course"], fields["favorite_teacher"], None,
+                          require_photo=False)
+
+
+def _to_params(row):
+    return (str(row["username"]).strip(), str(row["password"]), str(row["name"]).strip(),
+            str(row["roll_number"]).strip(), str(row["class"]).strip(), str(row["slot"]).strip(), None)
+
+
+def _valid_rows(rows, report):
+    for line_number, row in rows:
+        report.read += 1
+        error = validate_row(row)
+        if error:
+            report.invalid += 1
+            report.add_error(line_number, error)
+            continue
+        yield line_number, _to_params(row)
+
+
+def _write_chunk(conn, chunk, report):
+    """Inserts one chunk in a single transaction, falling back to per-row inserts on conflicts."""
+    try:
+        conn.executemany(INSERT_SQL, (params for _, params in chunk))
+        conn.commit()
+        report.inserted += len(chunk)
+        return
+    except sqlite3.IntegrityError:
+        conn.rollback()
+    # A failing statement only undoes itself, so the rest of the chunk still shares one transaction
+    for line_number, params in chunk:
+        try:
+            conn.execute(INSERT_SQL, params)
+            report.inserted += 1
+        except sqlite3.IntegrityError as e:
+            report.duplicates += 1
+            report.add_error(line_number, str(e))
+    conn.commit()
+
+
+def _hash_passwords(chunk, iterations):
+    """Replaces each row's plaintext password with its hash."""
+    hashes = get_password_pool().hash_many([params[1] for _, params in chunk], iterations)
+    return [(line_number, params[:1] + (password_hash,) + params[2:])
+            for (line_number, params), password_hash in zip(chunk, hashes)]
+
+
+def import_rows(rows, chunk_size=CHUNK_SIZE, iterations=IMPORT_ITERATIONS):
+    """Imports an iterable of (line_number, row dict) pairs and returns an ImportReport."""
+    report = ImportReport()
+    start = time.perf_counter()
+    valid = _valid_rows(rows, report)
+    while True:
+        chunk = list(islice(valid, chunk_size))
+        if not chunk:
+            break
+        chunk = _hash_passwords(chunk, iterations)  # Before taking a connection, so hashing holds no lock
+        with get_pool().connection() as conn:
+            _write_chunk(conn, chunk, report)
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def import_roster(path, chunk_size=CHUNK_SIZE, iterations=IMPORT_ITERATIONS):
+    """Streams a roster file into the students table and returns an ImportReport."""
+    return import_rows(read_roster(path), chunk_size, iterations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import a student roster (CSV or JSONL).")
+    parser.add_argument("path")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--iterations", type=int, default=IMPORT_ITERATIONS, help="PBKDF2 cost for imported passwords")
+    args = parser.parse_args()
+
+    setup_database()
+    report = import_roster(args.path, args.chunk_size, args.iterations)
+    print(report.summary())
+    for line_number, message in report.errors[:20]:
+        print(f"  line {line_number}: {message}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# metrics.py
+"""In-process timing metrics for the portal's hot paths.
+
+timed(name) is a context manager and a decorator; it records the elapsed
+time into a histogram in the process-wide registry. Histograms use fixed
+log-spaced buckets (about 19% wide), so recording is a bisect plus a few
+integer updates under a lock and percentiles are read straight from the
+bucket counts without keeping samples around.
+
+profiled(label) runs cProfile around a block and keeps the report text for
+the last few profiled blocks; the app uses it to profile a single rerun on
+demand from the Admin page.
+"""
+import bisect
+import cProfile
+import io
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Bucket upper bounds in seconds: 10 µs to ~2.8 min, four buckets per doubling
+BUCKET_BOUNDS = tuple(1e-5 * 2 ** (i / 4) for i in range(97))
+PROFILE_HISTORY = 5
+PROFILE_LINES = 40  # Functions kept per profile report, by cumulative time
+
+
+class Histogram:
+    """Counts observations (in seconds) into BUCKET_BOUNDS."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(BUCKET_BOUNDS) + 1)  # Last bucket catches anything larger
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        index = bisect.bisect_left(BUCKET_BOUNDS, seconds)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th quantile (0 < p <= 1), capped at max."""
+        with self._lock:
+            rank = p * self.count
+            seen = 0
+            for index, count in enumerate(self._counts):
+                seen += count
+                if count and seen >= rank:
+                    bound = BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else self.max
+                    return min(bound, self.max)
+        return 0.0
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count * 1000 if self.count else 0.0,
+            'p50_ms': self.percentile(0.50) * 1000,
+            'p90_ms': self.percentile(0.90) * 1000,
+            'p99_ms': self.percentile(0.99) * 1000,
+            'max_ms': self.max * 1000,
+            'total_ms': self.total * 1000,
+        }
+
+
+class MetricsRegistry:
+    """Named histograms plus the most recent cProfile reports."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self.profiles = deque(maxlen=PROFILE_HISTORY)  # (label, seconds, report text)
+
+    def histogram(self, name):
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, Histogram())
+        return histogram
+
+    def observe(self, name, seconds):
+        self.histogram(name).observe(seconds)
+
+    def snapshot(self):
+        """Returns one summary dict per metric, sorted by name."""
+        with self._lock:
+            items = sorted(self._histograms.items())
+        return [{'name': name, **histogram.summary()} for name, histogram in items]
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+            self.profiles.clear()
+
+
+_registry = MetricsRegistry()
+
+def get_registry():
+    """Returns the process-wide MetricsRegistry."""
+    return _registry
+
+
+def observe(name, seconds):
+    _registry.observe(name, seconds)
+
+
+@contextmanager
+def timed(name):
+    """Records how long the block (or decorated function) takes under `name`, even if it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _registry.observe(name, time.perf_counter() - start)
+
+
+@contextmanager
+def profiled(label):
+    """Runs cProfile around the block and stores the report in the registry.
+
+    Only one profiler can be active at a time; if another block is already
+    being profiled the block simply runs unprofiled.
+    """
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - start
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(PROFILE_LINES)
+        _registry.profiles.appendleft((label, elapsed, report.getvalue()))
+
+
+def snapshot():
+    return _registry.snapshot()
+
+
+def reset():
+    _registry.reset()
@@ -0,0 +1,152 @@
+# passwords.py
+"""Salted password hashing with a bounded verification pool.
+
+Hashes are PBKDF2-HMAC-SHA256 strings of the form
+`pbkdf2_sha256$<iterations>$<salt>$<hash>`. hashlib releases the GIL while
+deriving keys, so running derivations on a small thread pool lets concurrent
+logins proceed in parallel while capping the CPU a login storm can take.
+
+Bulk imports hash at IMPORT_ITERATIONS, a cheaper tier that keeps importing
+a large roster practical; needs_rehash() flags those hashes (and any legacy
+plaintext row, which verifies by constant-time comparison) so the caller
+upgrades them to ITERATIONS on the next successful login. No new row is
+stored in plaintext; the hash_plaintext_passwords migration hashed the rest.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from functools import lru_cache
+
+ALGORITHM = 'pbkdf2_sha256'
+ITERATIONS = 600_000  # Cost factor; raise over time, old hashes are upgraded on login
+IMPORT_ITERATIONS = 10_000  # Bulk-import tier (~1/60 the cost), upgraded to ITERATIONS on first login
+SALT_BYTES = 16
+
+VERIFY_WORKERS = min(4, os.cpu_count() or 1)
+MAX_PENDING = 64  # Derivations queued or running before new logins are turned away
+VERIFY_TIMEOUT = 10.0  # Total wait for a slot and the result; past it the call raises PasswordPoolBusy
+BUSY_MESSAGE = "Too many logins in progress, please try again."
+
+
+class PasswordPoolBusy(RuntimeError):
+    """Raised when too many password operations are already pending."""
+
+
+def _b64(data):
+    return base64.b64encode(data).decode('ascii').rstrip('=')
+
+
+def _unb64(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+def _derive(password, salt, iterations):
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
+
+
+def hash_password(password, iterations=None):
+    iterations = iterations or ITERATIONS
+    salt = secrets.token_bytes(SALT_BYTES)
+    return f"{ALGORITHM}${iterations}${_b64(salt)}${_b64(_derive(password, salt, iterations))}"
+
+
+def is_hashed(stored):
+    return stored.startswith(ALGORITHM + '$')
+
+
+def needs_rehash(stored, iterations=None):
+    """True for plaintext rows and hashes made with a lower cost than configured."""
+    if not is_hashed(stored):
+        return True
+    return int(stored.split('$')[1]) < (iterations or ITERATIONS)
+
+
+def verify_password(password, stored):
+    """Checks a password against a stored hash (or legacy plaintext) in constant time."""
+    if not is_hashed(stored):
+        return hmac.compare_digest(password.encode('utf-8'), stored.encode('utf-8'))
+    try:
+        _, iterations, salt, expected = stored.split('$')
+        derived = _derive(password, _unb64(salt), int(iterations))
+    except ValueError:
+        return False  # Malformed hash never matches
+    return hmac.compare_digest(derived, _unb64(expected))
+
+
+class PasswordPool:
+    """Runs hashing and verification on a bounded thread pool."""
+    def __init__(self, workers=VERIFY_WORKERS, max_pending=MAX_PENDING):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password")
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def _submit(self, fn, *args, timeout=VERIFY_TIMEOUT):
+        if not self._slots.acquire(timeout=timeout):
+            raise PasswordPoolBusy(BUSY_MESSAGE)
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _run(self, fn, *args, timeout=VERIFY_TIMEOUT):
+        """Runs fn on the pool, raising PasswordPoolBusy if it has not finished within timeout."""
+        deadline = time.monotonic() + timeout
+        future = self._submit(fn, *args, timeout=timeout)
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeout:
+            future.cancel()  # Frees its slot if it never started
+            raise PasswordPoolBusy(BUSY_MESSAGE) from None
+
+    def verify(self, password, stored, timeout=VERIFY_TIMEOUT):
+        return self._run(verify_password, password, stored, timeout=timeout)
+
+    def hash(self, password, timeout=VERIFY_TIMEOUT):
+        return self._run(hash_password, password, timeout=timeout)
+
+    def hash_many(self, passwords, iterations=IMPORT_ITERATIONS, timeout=None):
+        """Hashes a batch of passwords in order, e.g. one import chunk.
+
+        At most one derivation per worker is in flight, so a login arriving
+        mid-batch waits behind a few cheap derivations, not the whole batch.
+        By default it waits for free slots instead of raising PasswordPoolBusy.
+        """
+        hashes = []
+        in_flight = deque()
+        for password in passwords:
+            if len(in_flight) >= self.workers:
+                hashes.append(in_flight.popleft().result(timeout=timeout))
+            in_flight.append(self._submit(hash_password, password, iterations, timeout=timeout))
+        hashes.extend(future.result(timeout=timeout) for future in in_flight)
+        return hashes
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_password_pool():
+    """Returns the process-wide PasswordPool."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PasswordPool()
+        return _pool
+
+
+@lru_cache(maxsize=1)
+def dummy_hash():
+    """A hash to verify against when the username does not exist, so that
+    case costs the same as a wrong password."""
+    return hash_password(secrets.token_hex(8))
@@ -0,0 +1,334 @@
+# payments.py
+"""Asynchronous payment processing around a pluggable gateway.
+
+submit() records a payment intent in payment_intents and returns its id at
+once, so the Streamlit thread never waits on the gateway. An asyncio worker
+on a background thread claims due intents and charges them concurrently (up
+to MAX_CONCURRENCY at a time), each call bounded by GATEWAY_TIMEOUT.
+
+Every intent carries an idempotency key. Submitting a key again returns the
+existing intent instead of creating a second one, and the key is passed to
+the gateway, so retrying a charge whose outcome was lost cannot charge twice.
+A decline settles the intent as failed; timeouts and GatewayError are retried
+with exponential backoff and jitter, up to MAX_ATTEMPTS attempts.
+
+A claim is a lease: the intent records the claiming worker and when its
+lease expires. Only the owner can settle or reschedule it, and other
+workers (or this one after a restart) take it over only once the lease has
+expired, so a live charge is never started twice. The card token is cleared
+as soon as the intent settles.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+
+from database import get_db_connection
+from metrics import observe
+
+logger = logging.getLogger(__name__)
+
+PENDING, PROCESSING, SUCCEEDED, FAILED = 'pending', 'processing', 'succeeded', 'failed'
+FINAL_STATUSES = (SUCCEEDED, FAILED)
+
+MAX_CONCURRENCY = 32  # Gateway calls in flight at once
+GATEWAY_TIMEOUT = 10.0  # Seconds per gateway call before it counts as a transient failure
+MAX_ATTEMPTS = 4
+BACKOFF_BASE = 0.5  # Seconds before the first retry; doubles per attempt, with ±50% jitter
+POLL_INTERVAL = 1.0  # Longest the worker sleeps without checking for due intents
+LEASE_MARGIN = 30.0  # Seconds a claim outlives GATEWAY_TIMEOUT, to cover recording the outcome
+REMEMBERED_KEYS = 10000  # Outcomes SimulatedGateway replays per idempotency key
+
+INSERT_INTENT_SQL = '''
+    INSERT INTO payment_intents (idempotency_key, student_id, amount, token, next_attempt_at) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(idempotency_key) DO NOTHING
+'''
+INTENT_ID_BY_KEY_SQL = "SELECT id FROM payment_intents WHERE idempotency_key = ?"
+INTENT_SQL = '''
+    SELECT id, student_id, amount, status, message, attempts, created_at, updated_at
+    FROM payment_intents WHERE id = ?
+'''
+# Leases up to ?2 due intents (and any whose lease expired) to worker ?3 until ?4,
+# in one statement; served by idx_payment_intents_due
+CLAIM_SQL = f'''
+    UPDATE payment_intents SET status = '{PROCESSING}', attempts = attempts + 1,
+        claimed_by = ?3, lease_expires_at = ?4, updated_at = CURRENT_TIMESTAMP
+    WHERE id IN (
+        SELECT id FROM payment_intents
+        WHERE (status = '{PENDING}' AND next_attempt_at <= ?1) OR (status = '{PROCESSING}' AND lease_expires_at <= ?1)
+        ORDER BY next_attempt_at LIMIT ?2
+    )
+    RETURNING id, idempotency_key, amount, token, attempts
+'''
+# Both only apply while the caller still owns the lease; settling also drops the card token
+SETTLE_SQL = '''
+    UPDATE payment_intents SET status = ?, message = ?, token = '', claimed_by = NULL, lease_expires_at = NULL,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE id = ? AND claimed_by = ?
+'''
+RESCHEDULE_SQL = f'''
+    UPDATE payment_intents SET status = '{PENDING}', message = ?, next_attempt_at = ?, claimed_by = NULL,
+        lease_expires_at = NULL, updated_at = CURRENT_TIMESTAMP
+    WHERE id = ? AND claimed_by = ?
+'''
+NEXT_DUE_SQL = f"SELECT MIN(next_attempt_at) FROM payment_intents WHERE status = '{PENDING}'"
+
+
+class GatewayError(Exception):
+    """A transient gateway failure (network error, 5xx) whose outcome is unknown; the charge is retried."""
+
+
+class Gateway(ABC):
+    """Payment backend interface.
+
+    charge() returns (status, message) with status 'success' or 'failure' once
+    the gateway has decided, and raises GatewayError when the outcome is
+    unknown. Backends must treat a repeated idempotency_key as the same charge.
+    """
+    @abstractmethod
+    async def charge(self, amount, token, idempotency_key):
+        ...
+
+
+class SimulatedGateway(Gateway):
+    """The portal's stand-in gateway, features.process_payment, run off the event loop.
+
+    process_payment has no notion of idempotency, so the outcome for each of
+    the newest REMEMBERED_KEYS keys is kept and replayed on a repeated key.
+    """
+    def __init__(self, remembered=REMEMBERED_KEYS):
+        self.remembered = remembered
+        self._outcomes = OrderedDict()  # Only touched from the worker's event loop, so no lock
+
+    async def charge(self, amount, token, idempotency_key):
+        if idempotency_key in self._outcomes:
+            return self._outcomes[idempotency_key]
+        from features import process_payment  # Imported here; features pulls in the imaging stack
+        outcome = await asyncio.to_thread(process_payment, amount, token)
+        self._outcomes[idempotency_key] = outcome
+        if len(self._outcomes) > self.remembered:
+            self._outcomes.popitem(last=False)
+        return outcome
+
+
+class FakeGateway(Gateway):
+    """Local gateway for tests and load tests: fixed latency, seeded outcomes.
+
+    decline_rate and error_rate are the chances of a decline and of a
+    transient GatewayError. Like a real gateway it remembers the outcome per
+    idempotency key and replays it, so `charges` counts distinct keys charged
+    while `calls` counts every request, retries included.
+    """
+    def __init__(self, latency=0.2, decline_rate=0.0, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.decline_rate = decline_rate
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._outcomes = {}  # Only touched from the worker's event loop, so no lock
+        self.calls = 0
+
+    @property
+    def charges(self):
+        return len(self._outcomes)
+
+    async def charge(self, amount, token, idempotency_key):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if idempotency_key in self._outcomes:
+            return self._outcomes[idempotency_key]
+        roll = self._random.random()
+        if roll < self.error_rate:
+            raise GatewayError("Simulated gateway error")
+        if not amount or amount <= 0 or not token:
+            outcome = ("failure", "Invalid payment request")
+        elif roll < self.error_rate + self.decline_rate:
+            outcome = ("failure", "Card declined")
+        else:
+            outcome = ("success", "Payment successful")
+        self._outcomes[idempotency_key] = outcome
+        return outcome
+
+
+def new_idempotency_key():
+    return uuid.uuid4().hex
+
+
+def create_intent(amount, token, idempotency_key, student_id=None):
+    """Records a pending intent and returns its id; an existing key returns the existing intent's id."""
+    with get_db_connection() as cursor:
+        cursor.execute(INSERT_INTENT_SQL, (idempotency_key, student_id, amount, token, time.time()))
+        if cursor.rowcount:
+            return cursor.lastrowid
+        cursor.execute(INTENT_ID_BY_KEY_SQL, (idempotency_key,))
+        return cursor.fetchone()['id']
+
+
+def get_intent(intent_id):
+    """Returns the intent's id, student_id, amount, status, message, attempts and timestamps, or None."""
+    with get_db_connection() as cursor:
+        cursor.execute(INTENT_SQL, (intent_id,))
+        return cursor.fetchone()
+
+
+def _claim(limit, worker_id, lease):
+    now = time.time()
+    with get_db_connection() as cursor:
+        cursor.execute(CLAIM_SQL, (now, limit, worker_id, now + lease))
+        return cursor.fetchall()
+
+
+def _settle(intent_id, worker_id, status, message):
+    """Records a final outcome; returns False if the lease was lost to another worker."""
+    with get_db_connection() as cursor:
+        cursor.execute(SETTLE_SQL, (status, message, intent_id, worker_id))
+        return cursor.rowcount == 1
+
+
+def _reschedule(intent_id, worker_id, message, next_attempt_at):
+    """Puts an intent back in the queue; returns False if the lease was lost to another worker."""
+    with get_db_connection() as cursor:
+        cursor.execute(RESCHEDULE_SQL, (message, next_attempt_at, intent_id, worker_id))
+        return cursor.rowcount == 1
+
+
+def _seconds_until_due():
+    with get_db_connection() as cursor:
+        due = cursor.execute(NEXT_DUE_SQL).fetchone()[0]
+    return None if due is None else max(0.0, due - time.time())
+
+
+class PaymentProcessor:
+    """Runs the asyncio payment worker on a background thread."""
+    def __init__(self, gateway=None, concurrency=MAX_CONCURRENCY, timeout=GATEWAY_TIMEOUT,
+                 max_attempts=MAX_ATTEMPTS, backoff=BACKOFF_BASE, poll_interval=POLL_INTERVAL):
+        self.gateway = gateway or SimulatedGateway()
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.poll_interval = poll_interval
+        self.lease = timeout + LEASE_MARGIN
+        self.worker_id = uuid.uuid4().hex  # Owner of this processor's leases
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.retries = 0
+        self.gateway_latencies = deque(maxlen=10000)  # Seconds per gateway call, retries included
+        self._count_lock = threading.Lock()
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=asyncio.run, args=(self._run(),), name="payment-worker", daemon=True)
+        self._thread.start()
+        self._started.wait()
+
+    def submit(self, amount, token, idempotency_key, student_id=None):
+        """Records a payment intent and returns its id without waiting for the gateway.
+
+        Reusing an idempotency key returns the intent already recorded for it,
+        whatever the amount, so repeated clicks never create a second payment.
+        """
+        if not amount or amount <= 0:
+            raise ValueError(f"Invalid payment amount: {amount!r}")
+        if not token:
+            raise ValueError("A payment token is required")
+        intent_id = create_intent(amount, token, idempotency_key, student_id)
+        with self._count_lock:
+            self.submitted += 1
+        self._loop.call_soon_threadsafe(self._wake.set)
+        return intent_id
+
+    async def _run(self):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._started.set()
+        in_flight = set()
+        while not self._stopping.is_set():
+            self._wake.clear()  # Before claiming, so a submit during the claim still wakes us
+            free = self.concurrency - len(in_flight)
+            delay = None
+            if free > 0:
+                try:
+                    claimed = await asyncio.to_thread(_claim, free, self.worker_id, self.lease)
+                    for intent in claimed:
+                        task = asyncio.create_task(self._process(intent))
+                        in_flight.add(task)
+                        task.add_done_callback(in_flight.discard)
+                    if len(claimed) == free:
+                        continue  # Possibly more due
+                    delay = await asyncio.to_thread(_seconds_until_due)
+                except Exception:
+                    # Keep the worker alive; unclaimed intents stay pending
+                    logger.exception("Failed to claim payment intents")
+            # A finished charge frees a slot and wakes us, as does submit()
+            timeout = self.poll_interval if delay is None else min(self.poll_interval, delay)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        if in_flight:
+            await asyncio.gather(*in_flight)
+
+    async def _charge(self, intent):
+        """Calls the gateway once; returns (status, message, retry_at) with retry_at None when final."""
+        start = time.perf_counter()
+        try:
+            status, message = await asyncio.wait_for(
+                self.gateway.charge(intent['amount'], intent['token'], intent['idempotency_key']), self.timeout)
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                error = f"Gateway timed out after {self.timeout:g}s"
+            else:
+                if not isinstance(e, GatewayError):
+                    logger.exception("Unexpected error charging payment intent %s", intent['id'])
+                error = str(e) or type(e).__name__
+            if intent['attempts'] >= self.max_attempts:
+                return FAILED, f"Gave up after {intent['attempts']} attempts: {error}", None
+            delay = self.backoff * 2 ** (intent['attempts'] - 1) * random.uniform(0.5, 1.5)
+            return PENDING, error, time.time() + delay
+        finally:
+            elapsed = time.perf_counter() - start
+            self.gateway_latencies.append(elapsed)
+            observe('payment.gateway', elapsed)
+        return (SUCCEEDED if status == "success" else FAILED), message, None
+
+    async def _process(self, intent):
+        try:
+            status, message, retry_at = await self._charge(intent)
+            if retry_at is not None:
+                recorded = await asyncio.to_thread(_reschedule, intent['id'], self.worker_id, message, retry_at)
+                if recorded:
+                    self.retries += 1
+            else:
+                recorded = await asyncio.to_thread(_settle, intent['id'], self.worker_id, status, message)
+                if recorded and status == SUCCEEDED:
+                    self.succeeded += 1
+                elif recorded:
+                    self.failed += 1
+            if not recorded:
+                logger.warning("Lease on payment intent %s expired before its outcome was recorded", intent['id'])
+        except Exception:
+            # The intent stays in processing and is taken over once its lease expires
+            logger.exception("Failed to record the outcome of payment intent %s", intent['id'])
+        finally:
+            self._wake.set()
+
+    def close(self):
+        """Stops claiming new intents, waits for in-flight charges and stops the worker thread."""
+        def stop():
+            self._stopping.set()
+            self._wake.set()
+        self._loop.call_soon_threadsafe(stop)
+        self._thread.join()
+
+    def stats(self):
+        latencies = sorted(self.gateway_latencies)
+        def pct(p):
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else 0.0
+        return {
+            'submitted': self.submitted, 'succeeded': self.succeeded, 'failed': self.failed, 'retries': self.retries,
+            'gateway_p50_ms': pct(0.50), 'gateway_p99_ms': pct(0.99), 'gateway_max_ms': pct(1.0),
+        }
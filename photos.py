@@ -0,0 +1,115 @@
+# photos.py
+"""Content-addressed student photo store.
+
+Photos live in the `photos` table keyed by the SHA-256 of the uploaded bytes,
+so re-uploading the same image stores nothing new. The card-sized and display
+thumbnails are computed once on upload; `students` only carries `photo_hash`,
+keeping login and list queries free of image bytes.
+"""
+import hashlib
+import logging
+from io import BytesIO
+
+from PIL import Image  # type: ignore
+
+from database import get_db_connection
+from features import PHOTO_WIDTH, PHOTO_HEIGHT
+
+logger = logging.getLogger(__name__)
+
+DISPLAY_THUMB_SIZE = (150, 200)  # Matches the width=150 previews in app.py
+
+
+def photo_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def make_thumbnails(data):
+    """Returns (card_thumb, display_thumb) PNG/JPEG bytes for an uploaded image."""
+    with Image.open(BytesIO(data)) as image:
+        image = image.convert('RGB')
+        # Same stretch-to-fit resize generate_id_card has always applied
+        card = image.resize((PHOTO_WIDTH, PHOTO_HEIGHT))
+        display = image.copy()
+        display.thumbnail(DISPLAY_THUMB_SIZE)
+
+    card_bytes, display_bytes = BytesIO(), BytesIO()
+    card.save(card_bytes, format='PNG')
+    display.save(display_bytes, format='JPEG', quality=85)
+    return card_bytes.getvalue(), display_bytes.getvalue()
+
+
+def store_photo(cursor, data):
+    """Stores an image (once per distinct content) and returns its hash."""
+    digest = photo_hash(data)
+    cursor.execute("SELECT 1 FROM photos WHERE hash = ?", (digest,))
+    if not cursor.fetchone():
+        card_thumb, display_thumb = make_thumbnails(data)
+        cursor.execute("INSERT OR IGNORE INTO photos (hash, original, card_thumb, display_thumb) VALUES (?, ?, ?, ?)",
+                       (digest, data, card_thumb, display_thumb))
+    return digest
+
+
+def set_student_photo(student_id, data):
+    """Uploads a photo for a student and returns its hash."""
+    with get_db_connection() as cursor:
+        digest = store_photo(cursor, data)
+        cursor.execute("UPDATE students SET photo_hash = ?, photo = NULL WHERE id = ?", (digest, student_id))
+    return digest
+
+
+def _get_blob(column, digest):
+    if not digest:
+        return None
+    with get_db_connection() as cursor:
+        cursor.execute(f"SELECT {column} FROM photos WHERE hash = ?", (digest,))
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def get_card_thumbnail(digest):
+    return _get_blob('card_thumb', digest)
+
+
+def get_display_thumbnail(digest):
+    return _get_blob('display_thumb', digest)
+
+
+def get_original(digest):
+    return _get_blob('original', digest)
+
+
+def migrate_inline_photos(cursor, batch_size=200):
+    """Moves legacy `students.photo` blobs into the store. Returns the number moved.
+
+    Blobs PIL cannot decode have no thumbnails to store, so they are left in
+    `students.photo` untouched. Runs on the caller's cursor so it can take
+    part in a schema migration.
+    """
+    moved = kept = 0
+    last_id = 0
+    while True:
+        cursor.execute("SELECT id, photo FROM students WHERE photo IS NOT NULL AND id > ? ORDER BY id LIMIT ?",
+                       (last_id, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        for row in rows:
+            try:
+                digest = store_photo(cursor, row['photo'])
+            except (OSError, ValueError):
+                kept += 1
+                continue
+            cursor.execute("UPDATE students SET photo_hash = ?, photo = NULL WHERE id = ?", (digest, row['id']))
+            moved += 1
+        last_id = rows[-1]['id']
+    if kept:
+        logger.warning("Left %d undecodable legacy photos in students.photo", kept)
+    return moved
+
+
+def prune_orphans():
+    """Deletes stored photos no student references any more. Returns the number deleted."""
+    with get_db_connection() as cursor:
+        cursor.execute("DELETE FROM photos WHERE hash NOT IN (SELECT photo_hash FROM students WHERE photo_hash IS NOT NULL)")
+        return cursor.rowcount
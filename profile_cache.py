@@ -0,0 +1,46 @@
+# profile_cache.py
+"""Per-session cache of the logged-in student's profile.
+
+The projected students row is loaded once at login and kept in
+st.session_state, so reruns do not touch the database. The display
+thumbnail is loaded the first time a page asks for it. Call
+invalidate_profile() on logout or after changing the student's row.
+"""
+import streamlit as st  # type: ignore
+
+import queries
+from photos import get_display_thumbnail
+
+_PROFILE_KEY = 'profile'
+_THUMBNAIL_KEY = 'profile_thumbnail'
+
+
+def load_profile(username):
+    """Fetches and caches the profile for a freshly logged-in user."""
+    row = queries.get_profile(username)
+    st.session_state[_PROFILE_KEY] = dict(row) if row else None
+    st.session_state.pop(_THUMBNAIL_KEY, None)
+    return st.session_state[_PROFILE_KEY]
+
+
+def get_profile():
+    """Returns the cached profile dict, loading it only if the session has none yet."""
+    if _PROFILE_KEY not in st.session_state:
+        if not st.session_state.get('username'):
+            return None
+        return load_profile(st.session_state.username)
+    return st.session_state[_PROFILE_KEY]
+
+
+def get_profile_thumbnail():
+    """Returns the display thumbnail bytes for the logged-in student, or None."""
+    if _THUMBNAIL_KEY not in st.session_state:
+        profile = get_profile()
+        photo_hash = profile and profile['photo_hash']
+        st.session_state[_THUMBNAIL_KEY] = get_display_thumbnail(photo_hash) if photo_hash else None
+    return st.session_state[_THUMBNAIL_KEY]
+
+
+def invalidate_profile():
+    st.session_state.pop(_PROFILE_KEY, None)
+    st.session_state.pop(_THUMBNAIL_KEY, None)
@@ -0,0 +1,200 @@
+# queries.py
+"""Data-access layer for the students table and course feedback.
+
+Every query names its columns, is served by an index (the UNIQUE
+constraints from Database.create_tables, or idx_students_slot from
+Database.add_student_indexes), and is timed: all queries are logged at DEBUG
+and anything slower than SLOW_QUERY_MS at WARNING.
+
+tests/test_queries.py checks that the query plans still use those indexes;
+`python queries.py --check-plans` prints the plans against the live database.
+"""
+import logging
+import secrets
+import sys
+import time
+
+from database import get_db_connection
+from metrics import observe
+from passwords import dummy_hash, get_password_pool, needs_rehash
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = 50.0
+
+# Self-registered accounts have no roll number yet; roll_number is UNIQUE NOT
+# NULL, so each gets a unique placeholder until the profile is filled in
+PENDING_ROLL_PREFIX = "PENDING-"
+
+# Column named in a "UNIQUE constraint failed" error -> message for the user
+DUPLICATE_MESSAGES = {
+    'students.username': "Username already exists.",
+    'students.roll_number': "A student with this roll number is already registered.",
+}
+
+# Columns a page needs to show a student; never includes image bytes
+PROFILE_COLUMNS = "id, username, name, roll_number, class, slot, photo_hash"
+
+LOGIN_SQL = "SELECT id, password FROM students WHERE username = ?"
+REHASH_SQL = "UPDATE students SET password = ? WHERE id = ? AND password = ?"
+USERNAME_EXISTS_SQL = "SELECT id FROM students WHERE username = ?"
+ROLL_NUMBER_EXISTS_SQL = "SELECT id FROM students WHERE roll_number = ?"
+PROFILE_BY_USERNAME_SQL = f"SELECT {PROFILE_COLUMNS} FROM students WHERE username = ?"
+PROFILE_BY_ROLL_NUMBER_SQL = f"SELECT {PROFILE_COLUMNS} FROM students WHERE roll_number = ?"
+STUDENTS_IN_SLOT_SQL = "SELECT id, name, roll_number FROM students WHERE slot = ? ORDER BY name"
+INSERT_STUDENT_SQL = "INSERT INTO students (username, password, name, roll_number, class, slot) VALUES (?, ?, ?, ?, ?, ?)"
+INSERT_FEEDBACK_SQL = "INSERT INTO feedback (student_id, course_id, text) SELECT ?, id, ? FROM courses WHERE name = ?"
+
+# query -> index its plan must use; "COVERING" means no table lookup at all
+EXPECTED_PLANS = {
+    LOGIN_SQL: "INDEX sqlite_autoindex_students_1",
+    USERNAME_EXISTS_SQL: "COVERING INDEX sqlite_autoindex_students_1",
+    ROLL_NUMBER_EXISTS_SQL: "COVERING INDEX sqlite_autoindex_students_2",
+    PROFILE_BY_USERNAME_SQL: "INDEX sqlite_autoindex_students_1",
+    PROFILE_BY_ROLL_NUMBER_SQL: "INDEX sqlite_autoindex_students_2",
+    STUDENTS_IN_SLOT_SQL: "COVERING INDEX idx_students_slot",
+}
+
+
+def _execute(cursor, sql, params=()):
+    start = time.perf_counter()
+    cursor.execute(sql, params)
+    return start
+
+
+def _log_timing(sql, start):
+    elapsed = time.perf_counter() - start
+    observe('db.query', elapsed)
+    elapsed_ms = elapsed * 1000
+    if elapsed_ms >= SLOW_QUERY_MS:
+        logger.warning("Slow query (%.1f ms): %s", elapsed_ms, sql)
+    else:
+        logger.debug("Query (%.2f ms): %s", elapsed_ms, sql)
+
+
+def fetch_one(sql, params=()):
+    with get_db_connection() as cursor:
+        start = _execute(cursor, sql, params)
+        row = cursor.fetchone()
+    _log_timing(sql, start)
+    return row
+
+
+def fetch_all(sql, params=()):
+    with get_db_connection() as cursor:
+        start = _execute(cursor, sql, params)
+        rows = cursor.fetchall()
+    _log_timing(sql, start)
+    return rows
+
+
+def execute(sql, params=()):
+    """Runs a write statement in its own transaction and returns lastrowid."""
+    with get_db_connection() as cursor:
+        start = _execute(cursor, sql, params)
+        row_id = cursor.lastrowid
+    _log_timing(sql, start)
+    return row_id
+
+
+def authenticate(username, password):
+    """Returns the student id for matching credentials, or None.
+
+    The hash check runs on the bounded password pool. Plaintext or
+    under-cost hashes are upgraded after a successful login.
+    """
+    row = fetch_one(LOGIN_SQL, (username,))
+    pool = get_password_pool()
+    if row is None:
+        pool.verify(password, dummy_hash())
+        return None
+    if not pool.verify(password, row['password']):
+        return None
+    if needs_rehash(row['password']):
+        # Guarded on the old value so a concurrent password change is not overwritten
+        execute(REHASH_SQL, (pool.hash(password), row['id'], row['password']))
+    return row['id']
+
+
+def username_exists(username):
+    return fetch_one(USERNAME_EXISTS_SQL, (username,)) is not None
+
+
+def roll_number_exists(roll_number):
+    return fetch_one(ROLL_NUMBER_EXISTS_SQL, (roll_number,)) is not None
+
+
+def get_profile(username):
+    return fetch_one(PROFILE_BY_USERNAME_SQL, (username,))
+
+
+def get_profile_by_roll_number(roll_number):
+    return fetch_one(PROFILE_BY_ROLL_NUMBER_SQL, (roll_number,))
+
+
+def students_in_slot(slot):
+    return fetch_all(STUDENTS_IN_SLOT_SQL, (slot,))
+
+
+def create_student(username, password, name, roll_number, student_class, slot):
+    """Inserts a student with a hashed password and returns the new id.
+
+    Raises sqlite3.IntegrityError on duplicates; see duplicate_message.
+    """
+    password_hash = get_password_pool().hash(password)
+    return execute(INSERT_STUDENT_SQL, (username, password_hash, name, roll_number, student_class, slot))
+
+
+def register_student(username, password):
+    """Creates an account with an empty profile and a placeholder roll number; returns the new id."""
+    return create_student(username, password, '', PENDING_ROLL_PREFIX + secrets.token_hex(8), '', '')
+
+
+def duplicate_message(error):
+    """The user-facing message for an IntegrityError from create_student."""
+    for column, message in DUPLICATE_MESSAGES.items():
+        if str(error) == f"UNIQUE constraint failed: {column}":
+            return message
+    return "Registration failed, please try again."
+
+
+def add_feedback(student_id, course, text):
+    """Stores feedback on a course (by name) and returns the new id, or None for an unknown course."""
+    with get_db_connection() as cursor:
+        start = _execute(cursor, INSERT_FEEDBACK_SQL, (student_id, text, course))
+        row_id = cursor.lastrowid if cursor.rowcount else None
+    _log_timing(INSERT_FEEDBACK_SQL, start)
+    return row_id
+
+
+def query_plan(sql):
+    """Returns the EXPLAIN QUERY PLAN detail lines for a query."""
+    params = (None,) * sql.count("?")
+    with get_db_connection() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return [row['detail'] for row in cursor.fetchall()]
+
+
+def check_query_plans():
+    """Checks every query in EXPECTED_PLANS is served by its index. Returns the plans.
+
+    Raises AssertionError explicitly, so the check still runs under python -O.
+    """
+    plans = {}
+    for sql, expected in EXPECTED_PLANS.items():
+        plan = query_plan(sql)
+        if not any(f"USING {expected}" in line for line in plan):
+            raise AssertionError(f"{sql!r} does not use {expected}: {plan}")
+        if any(line.startswith("SCAN") for line in plan):
+            raise AssertionError(f"{sql!r} scans a table: {plan}")
+        plans[sql] = plan
+    return plans
+
+
+if __name__ == "__main__":
+    if "--check-plans" in sys.argv:
+        from database import setup_database
+        setup_database()
+        for sql, plan in check_query_plans().items():
+            print(f"{sql}\n    {' | '.join(plan)}")
+        print("All query plans use their indexes.")
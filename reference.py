@@ -0,0 +1,66 @@
+# reference.py
+"""Cached reference data: courses, slot teachers and FAQs.
+
+The tables change rarely, so they are loaded in one pass into an immutable
+snapshot held in Streamlit's resource cache. Page renders are dictionary
+lookups. The snapshot expires after REFERENCE_TTL seconds, and the write
+helpers below invalidate it immediately so pages never show stale data
+written through this process.
+"""
+from collections import namedtuple
+from types import MappingProxyType
+
+import streamlit as st  # type: ignore
+
+import database
+from database import get_db_connection
+
+REFERENCE_TTL = 600  # Seconds; bounds staleness from writes made by other processes
+
+ReferenceData = namedtuple('ReferenceData', ['courses', 'slot_teachers', 'faqs'])
+
+
+@st.cache_resource(ttl=REFERENCE_TTL)
+def _load_reference_data(db_name):
+    with get_db_connection() as cursor:
+        cursor.execute("SELECT name FROM courses ORDER BY id")
+        courses = tuple(row['name'] for row in cursor.fetchall())
+        cursor.execute("SELECT slot, name FROM teachers ORDER BY id")
+        slot_teachers = {row['slot']: row['name'] for row in cursor.fetchall()}
+        cursor.execute("SELECT topic, question FROM faqs ORDER BY id")
+        faqs = {}
+        for row in cursor.fetchall():
+            faqs.setdefault(row['topic'], []).append(row['question'])
+    # Read-only views: the snapshot is shared by every session
+    return ReferenceData(courses, MappingProxyType(slot_teachers),
+                         MappingProxyType({topic: tuple(questions) for topic, questions in faqs.items()}))
+
+
+def get_reference_data():
+    """Returns the current ReferenceData snapshot, loading it if needed."""
+    return _load_reference_data(database.DB_NAME)
+
+
+def invalidate_reference_data():
+    """Drops the cached snapshot; the next read reloads from the database."""
+    _load_reference_data.clear()
+
+
+def add_course(name):
+    with get_db_connection() as cursor:
+        cursor.execute("INSERT INTO courses (name) VALUES (?)", (name,))
+    invalidate_reference_data()
+
+
+def set_slot_teacher(slot, teacher_name):
+    """Assigns the teacher for a slot, creating the slot if needed."""
+    with get_db_connection() as cursor:
+        cursor.execute("INSERT INTO teachers (name, slot) VALUES (?, ?) ON CONFLICT(slot) DO UPDATE SET name = excluded.name",
+                       (teacher_name, slot))
+    invalidate_reference_data()
+
+
+def add_faq(topic, question):
+    with get_db_connection() as cursor:
+        cursor.execute("INSERT OR IGNORE INTO faqs (topic, question) VALUES (?, ?)", (topic, question))
+    invalidate_reference_data()
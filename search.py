@@ -0,0 +1,139 @@
+# search.py
+"""Full-text search over students, courses and course feedback.
+
+Backed by the external-content FTS5 tables created in Database.add_search
+(students_fts, courses_fts, feedback_fts), which triggers keep in sync with
+their base tables. Every word the user types is matched as a prefix, so
+"aye kha" finds "Ayesha Khan" and "giaic-0012" finds roll numbers starting
+with GIAIC-0012. Results are ranked by bm25 in SQL over every match; only
+prefixes broad enough to match more than MAX_CANDIDATES rows fall back to
+ranking the newest MAX_CANDIDATES. Lookups go through the FTS index and never
+scan the base tables.
+
+Usage: python search.py "query"
+"""
+import re
+import sys
+import time
+
+from database import get_db_connection
+from metrics import observe
+
+DEFAULT_LIMIT = 20
+# Matches a query may have and still be ranked in full. Ranking every match of
+# a broad prefix such as "a" or "kh" costs ~0.5 s at 500k rows, so those rank
+# the newest MAX_CANDIDATES matches instead, which keeps them in milliseconds.
+MAX_CANDIDATES = 2000
+
+# bm25 column weights: a name hit outranks a roll number hit, which outranks a slot hit
+STUDENT_WEIGHTS = (10.0, 5.0, 1.0)
+
+
+def _search_sql(fts, score, select):
+    """Builds the (ranked, newest-first) variants of a search over one FTS index.
+
+    `select` reads the best hits, already limited, from `hits` (rowid, score).
+    Parameters: ?1 = match expression, ?2 = MAX_CANDIDATES, ?3 = result limit.
+    """
+    matches = f"SELECT rowid, {score} AS score FROM {fts} WHERE {fts} MATCH ?1"
+    ranked = f"WITH hits AS ({matches} ORDER BY score LIMIT ?3) {select}"
+    newest = (f"WITH hits AS (SELECT rowid, score FROM ({matches} ORDER BY rowid DESC LIMIT ?2) "
+              f"ORDER BY score LIMIT ?3) {select}")
+    return fts, ranked, newest
+
+
+SEARCH_STUDENTS_SQL = _search_sql('students_fts', f"bm25(students_fts, {', '.join(map(str, STUDENT_WEIGHTS))})", '''
+    SELECT s.id, s.username, s.name, s.roll_number, s.slot
+    FROM hits JOIN students s ON s.id = hits.rowid
+    ORDER BY hits.score
+''')
+SEARCH_COURSES_SQL = _search_sql('courses_fts', 'rank', '''
+    SELECT c.id, c.name
+    FROM hits JOIN courses c ON c.id = hits.rowid
+    ORDER BY hits.score
+''')
+# The excerpt is built only for the returned rows, by a rowid lookup into the index
+SEARCH_FEEDBACK_SQL = _search_sql('feedback_fts', 'rank', '''
+    SELECT f.id, s.name AS student, s.roll_number, c.name AS course, f.created_at,
+           (SELECT snippet(feedback_fts, 0, '**', '**', '…', 16) FROM feedback_fts
+            WHERE feedback_fts MATCH ?1 AND feedback_fts.rowid = hits.rowid) AS excerpt
+    FROM hits
+    JOIN feedback f ON f.id = hits.rowid
+    JOIN students s ON s.id = f.student_id
+    JOIN courses c ON c.id = f.course_id
+    ORDER BY hits.score
+''')
+
+_WORD = re.compile(r"\w+")
+
+
+def match_expression(text):
+    """Turns free text into an FTS5 query: every word must match as a prefix.
+
+    Punctuation (including FTS5 operators) is dropped, so user input can never
+    produce a query syntax error. Returns None when there is nothing to search.
+    """
+    words = _WORD.findall(text.lower())
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def _is_broad(cursor, fts, expression):
+    """True when the expression matches more than MAX_CANDIDATES rows; reads at most that many rowids."""
+    cursor.execute(f"SELECT COUNT(*) FROM (SELECT rowid FROM {fts} WHERE {fts} MATCH ? LIMIT ?)",
+                   (expression, MAX_CANDIDATES + 1))
+    return cursor.fetchone()[0] > MAX_CANDIDATES
+
+
+def _search(sql, text, limit, metric):
+    fts, ranked, newest = sql
+    expression = match_expression(text)
+    if expression is None:
+        return []
+    start = time.perf_counter()
+    with get_db_connection() as cursor:
+        query = newest if _is_broad(cursor, fts, expression) else ranked
+        cursor.execute(query, (expression, MAX_CANDIDATES, limit))
+        rows = cursor.fetchall()
+    observe(metric, time.perf_counter() - start)
+    return rows
+
+
+def search_students(text, limit=DEFAULT_LIMIT):
+    """Students whose name, roll number or slot match, best first."""
+    return _search(SEARCH_STUDENTS_SQL, text, limit, 'search.students')
+
+
+def search_courses(text, limit=DEFAULT_LIMIT):
+    return _search(SEARCH_COURSES_SQL, text, limit, 'search.courses')
+
+
+def search_feedback(text, limit=DEFAULT_LIMIT):
+    """Feedback entries matching the text, with a highlighted excerpt."""
+    return _search(SEARCH_FEEDBACK_SQL, text, limit, 'search.feedback')
+
+
+def search(text, limit=DEFAULT_LIMIT):
+    """Runs all three searches; returns {'students': rows, 'courses': rows, 'feedback': rows}."""
+    return {
+        'students': search_students(text, limit),
+        'courses': search_courses(text, limit),
+        'feedback': search_feedback(text, limit),
+    }
+
+
+def check_integrity():
+    """Runs FTS5's integrity-check on every index; raises sqlite3.DatabaseError if one is out of sync."""
+    with get_db_connection() as cursor:
+        for fts in ('students_fts', 'courses_fts', 'feedback_fts'):
+            cursor.execute(f"INSERT INTO {fts} ({fts}, rank) VALUES ('integrity-check', 1)")
+
+
+if __name__ == "__main__":
+    from database import setup_database
+    setup_database()
+    for kind, rows in search(" ".join(sys.argv[1:])).items():
+        print(f"{kind}: {len(rows)}")
+        for row in rows:
+            print("   ", dict(row))
@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+
+@pytest.fixture
+def portal_db(tmp_path, monkeypatch):
+    """A freshly migrated database in a temporary directory, used by every pooled connection."""
+    monkeypatch.setattr(database, "DB_NAME", str(tmp_path / "portal.db"))
+    db = database.Database()
+    yield db
+    db.close()
+    database.close_pool()
@@ -0,0 +1,37 @@
+import aggregates
+import database
+
+
+def test_deleting_history_frees_the_student_for_deletion(portal_db):
+    with database.get_db_connection() as cursor:
+        cursor.execute("INSERT INTO students (username, password, name, roll_number, class, slot) "
+                       "VALUES ('leaver', 'pw', 'Leaver', 'GIAIC-LEAVE-1', 'Batch 2024', 'Leaving Slot')")
+        student_id = cursor.lastrowid
+        course_id = cursor.execute("SELECT id FROM courses LIMIT 1").fetchone()[0]
+        cursor.execute("INSERT INTO attendance (student_id, date, status) VALUES (?, '2026-01-05', 'present')", (student_id,))
+        cursor.execute("INSERT INTO results (student_id, course_id, status, marks) VALUES (?, ?, 'Passed', 75)",
+                       (student_id, course_id))
+        assert aggregates.verify_aggregates(cursor) == {}
+
+        cursor.execute("DELETE FROM attendance WHERE student_id = ?", (student_id,))
+        cursor.execute("DELETE FROM results WHERE student_id = ?", (student_id,))
+        cursor.execute("DELETE FROM students WHERE id = ?", (student_id,))
+
+        assert aggregates.verify_aggregates(cursor) == {}
+        for table in ('student_attendance_stats', 'student_result_stats'):
+            assert cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE student_id = ?", (student_id,)).fetchone()[0] == 0
+        assert cursor.execute("SELECT COUNT(*) FROM slot_headcounts WHERE slot = 'Leaving Slot'").fetchone()[0] == 0
+
+
+def test_moving_a_result_to_another_student_drops_the_empty_row(portal_db):
+    with database.get_db_connection() as cursor:
+        ids = []
+        for i in range(2):
+            cursor.execute("INSERT INTO students (username, password, name, roll_number, class, slot) "
+                           "VALUES (?, 'pw', ?, ?, 'Batch 2024', 'Monday 2-5 PM')", (f"u{i}", f"U {i}", f"GIAIC-U-{i}"))
+            ids.append(cursor.lastrowid)
+        course_id = cursor.execute("SELECT id FROM courses LIMIT 1").fetchone()[0]
+        cursor.execute("INSERT INTO results (student_id, course_id, status) VALUES (?, ?, 'Passed')", (ids[0], course_id))
+        cursor.execute("UPDATE results SET student_id = ? WHERE student_id = ?", (ids[1], ids[0]))
+        assert aggregates.verify_aggregates(cursor) == {}
+        cursor.execute("DELETE FROM students WHERE id = ?", (ids[0],))
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+import analytics
+from utils import Course
+
+# Each cutoff, one mark and half a mark either side, and the ends of the scale
+BOUNDARY_MARKS = sorted({cutoff + delta for cutoff in analytics.GRADE_CUTOFFS.tolist()
+                         for delta in (-1, -0.5, 0, 0.5, 1)} | {0, 100})
+
+
+def columns(marks, passed_status, slots=None):
+    slots = slots or ["Monday 2-5 PM"] * len(marks)
+    return analytics.ResultColumns(np.array(marks, dtype=float), np.array(passed_status, dtype=bool),
+                                   ["Python"] * len(marks), slots, ["Sir Zia"] * len(marks))
+
+
+@pytest.mark.parametrize("mark", BOUNDARY_MARKS)
+def test_grades_match_course_get_grade_at_each_cutoff(mark):
+    assert analytics.grades(np.array([mark], dtype=float)).tolist() == [Course("any").get_grade(mark)]
+
+
+def test_missing_marks_grade_as_f():
+    assert analytics.grades(np.array([np.nan, 95.0, np.nan])).tolist() == ["F", "A", "F"]
+
+
+def test_grades_of_empty_input():
+    assert analytics.grades(np.array([], dtype=float)).tolist() == []
+
+
+def test_summarize_empty():
+    report = analytics.summarize(columns([], []))
+    assert report['students'] == 0
+    assert report['pass_rate'] == 0.0
+    assert report['grade_distribution'] == dict.fromkeys(["F", "D", "C", "B", "A"], 0)
+    assert report['by_course'] == report['by_slot'] == report['by_teacher'] == {}
+
+
+def test_summarize_all_missing_marks_uses_recorded_status():
+    report = analytics.summarize(columns([np.nan] * 4, [True, False, True, True],
+                                         slots=["Mon", "Mon", "Tue", "Tue"]))
+    assert report['pass_rate'] == 0.75
+    assert sum(report['grade_distribution'].values()) == 0
+    assert report['by_slot'] == {
+        'Mon': {'students': 2, 'pass_rate': 0.5, 'mean_marks': None},
+        'Tue': {'students': 2, 'pass_rate': 1.0, 'mean_marks': None},
+    }
+
+
+def test_summarize_mixed_marks_matches_scalar_grading():
+    marks = [59, 60, 75, np.nan, 90, 100]
+    status = [True, False, False, False, False, False]
+    report = analytics.summarize(columns(marks, status))
+    course = Course("any")
+    expected = [course.get_grade(mark) for mark in marks if not np.isnan(mark)]
+    assert report['grade_distribution'] == {grade: expected.count(grade) for grade in "FDCBA"}
+    assert report['pass_rate'] == 4 / 6  # 59 fails; NaN falls back to its (failed) status
+    assert report['by_course']['Python']['mean_marks'] == pytest.approx(np.nanmean(marks))
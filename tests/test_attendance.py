@@ -0,0 +1,70 @@
+import datetime
+import sqlite3
+
+import pytest
+
+import attendance
+import database
+
+STAMP = datetime.datetime(2026, 1, 5, 14, 0, 0)
+
+
+@pytest.fixture
+def students(portal_db):
+    with database.get_db_connection() as cursor:
+        cursor.executemany("INSERT INTO students (username, password, name, roll_number, class, slot) "
+                           "VALUES (?, 'pw', ?, ?, 'Batch 2024', 'Monday 2-5 PM')",
+                           ((f"user{i}", f"Student {i}", f"GIAIC-{i:06d}") for i in range(25)))
+    return [f"GIAIC-{i:06d}" for i in range(25)]
+
+
+@pytest.fixture
+def writer(students, monkeypatch):
+    monkeypatch.setattr(attendance, "RETRY_DELAY", 0)
+    writer = attendance.AttendanceWriter(batch_size=10)
+    # Stop the background thread so the test drives every write itself
+    writer._stop.set()
+    writer._thread.join()
+    return writer
+
+
+def attendance_rows():
+    with database.get_db_connection() as cursor:
+        return cursor.execute("SELECT COUNT(*) FROM attendance").fetchone()[0]
+
+
+def test_flush_writes_in_batch_size_transactions(writer, students):
+    for roll_number in students:
+        writer.submit(roll_number, attendance.CHECK_IN, STAMP)
+    writer.flush()
+    assert writer.batches == 3
+    assert writer.written == 25 and attendance_rows() == 25
+
+
+def test_transient_errors_are_retried(writer, students, monkeypatch):
+    write = writer._write
+    failures = iter([sqlite3.OperationalError("database is locked")] * 2)
+
+    def flaky_write(events):
+        error = next(failures, None)
+        if error:
+            raise error
+        write(events)
+
+    monkeypatch.setattr(writer, "_write", flaky_write)
+    writer._write_with_retry([attendance.AttendanceEvent(students[0], attendance.CHECK_IN, STAMP)])
+    assert writer.written == 1 and writer.failed == 0 and attendance_rows() == 1
+
+
+def test_a_batch_that_keeps_failing_is_requeued(writer, students):
+    def locked(events):
+        raise sqlite3.OperationalError("database is locked")
+
+    events = [attendance.AttendanceEvent(students[0], attendance.CHECK_IN, STAMP)]
+    writer._write = locked
+    writer._write_with_retry(events)
+    assert writer._requeued == events and writer.failed == 0
+
+    del writer._write  # The database is back
+    writer.flush()
+    assert writer.written == 1 and attendance_rows() == 1
@@ -0,0 +1,61 @@
+import re
+import zipfile
+from io import BytesIO
+
+from PIL import Image  # type: ignore
+
+import card_batch
+from features import CARD_HEIGHT, CARD_WIDTH
+
+
+def row(roll_number, name="Student"):
+    return {'name': name, 'roll_number': roll_number, 'slot': "Monday 2-5 PM", 'class': "Python",
+            'teacher': "Sir Zia", 'photo': None}
+
+
+# The middle row cannot be rendered (a card needs a name)
+ROWS = [row("GIAIC-1"), row("GIAIC-2", name=None), row("GIAIC-3")]
+
+
+def pdf_objects(data):
+    """Checks the xref table and trailer; returns {object number: object bytes}."""
+    assert data.startswith(b"%PDF-1.4\n") and data.endswith(b"%%EOF\n")
+    xref_offset = int(re.search(rb"startxref\n(\d+)\n%%EOF\n$", data).group(1))
+    assert data[xref_offset:].startswith(b"xref\n")
+    size = int(re.search(rb"trailer\n<< /Size (\d+) /Root 1 0 R >>", data).group(1))
+    entries = re.findall(rb"(\d{10}) (\d{5}) ([fn]) \n", data[xref_offset:])
+    assert len(entries) == size and entries[0][2] == b"f"
+    objects = {}
+    for number, (offset, _, _) in enumerate(entries[1:], start=1):
+        start = int(offset)
+        assert data[start:].startswith(f"{number} 0 obj\n".encode()), number
+        objects[number] = data[start:data.index(b"\nendobj\n", start)]
+    return objects
+
+
+def test_pdf_round_trip_skips_the_failed_card(tmp_path):
+    path = tmp_path / "cards.pdf"
+    report = card_batch.render_batch(ROWS, str(path), 'pdf', workers=1)
+    assert report.rendered == 2
+    assert [roll_no for roll_no, _ in report.failures] == ["GIAIC-2"]
+
+    objects = pdf_objects(path.read_bytes())
+    assert objects[1].endswith(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = [int(n) for n in re.findall(rb"(\d+) 0 R", objects[2])]
+    assert b"/Count 2" in objects[2] and len(kids) == 2
+    for page in kids:
+        image_id = int(re.search(rb"/Im0 (\d+) 0 R", objects[page]).group(1))
+        image = objects[image_id]
+        length = int(re.search(rb"/Length (\d+)", image).group(1))
+        stream = image[image.index(b"stream\n") + 7:][:length]
+        assert Image.open(BytesIO(stream)).size == (CARD_WIDTH, CARD_HEIGHT)
+
+
+def test_zip_keeps_input_order_and_isolates_failures(tmp_path):
+    path = tmp_path / "cards.zip"
+    report = card_batch.render_batch(ROWS, str(path), 'zip', workers=2)
+    assert report.rendered == 2 and len(report.failures) == 1
+    assert "AttributeError" in report.failures[0][1]
+    with zipfile.ZipFile(path) as archive:
+        assert archive.namelist() == ["GIAIC-1.png", "GIAIC-3.png"]
+        assert Image.open(archive.open("GIAIC-3.png")).size == (CARD_WIDTH, CARD_HEIGHT)
@@ -0,0 +1,36 @@
+import card_cache
+import database
+import metrics
+import queries
+
+STUDENT = {'name': 'Ayesha Khan', 'roll_no': 'GIAIC-000001', 'slot': 'Monday 2-5 PM'}
+
+
+def test_hits_and_misses_reach_the_metrics_registry(portal_db):
+    metrics.reset()
+    etag, image = card_cache.get_card(STUDENT)
+    assert card_cache.get_card(STUDENT) == (etag, image)
+
+    counts = {row['name']: row['count'] for row in metrics.snapshot()}
+    assert counts['card_cache.miss'] == 1 and counts['card_cache.hit'] == 1
+    assert card_cache.cache_stats()['entries'] == 1
+
+
+def test_eviction_drops_least_recently_used_until_under_budget(portal_db):
+    for n in range(5):
+        card_cache.store_card(f"etag-{n}", b"x" * 100, max_bytes=10_000)
+    with database.get_db_connection() as cursor:
+        cursor.executemany("UPDATE card_cache SET last_used = ? WHERE etag = ?",
+                           ((n, f"etag-{n}") for n in range(5)))
+    evictions = card_cache.cache_stats()['evictions']
+    card_cache.store_card("etag-new", b"x" * 100, max_bytes=250)
+    stats = card_cache.cache_stats()
+    assert stats['bytes'] == 200 and stats['evictions'] - evictions == 4
+    assert card_cache.get_cached_card("etag-4") is not None
+    assert card_cache.get_cached_card("etag-3") is None
+
+
+def test_eviction_reads_only_the_lru_index(portal_db):
+    for sql in (card_cache.TOTAL_SIZE_SQL, card_cache.EVICT_SQL):
+        plan = " ".join(queries.query_plan(sql))
+        assert "COVERING INDEX idx_card_cache_lru" in plan, plan
@@ -0,0 +1,27 @@
+import database
+
+
+def test_setup_database_reports_notices_once_and_releases_its_connection(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_NAME", str(tmp_path / "portal.db"))
+    database._get_database.clear()
+    try:
+        assert database.setup_database() == ["Default student account 'student'/'student123' created for testing."]
+        assert database.setup_database() == []
+        pool = database.get_pool()
+        assert pool._idle.qsize() == pool._created  # Nothing left checked out
+    finally:
+        database._get_database.clear()
+        database.close_pool()
+
+
+def test_one_insert_counts_as_one_query(portal_db):
+    database.reset_query_count()
+    with database.get_db_connection() as cursor:
+        # Fires the FTS5 and aggregate triggers, which must not be counted
+        cursor.execute("INSERT INTO students (username, password, name, roll_number, class, slot) "
+                       "VALUES ('ann', 'pw', 'Ann', 'GIAIC-000001', 'Batch 2024', 'Monday 2-5 PM')")
+    assert database.query_count() == 1
+    with database.get_pool().connection() as conn:
+        conn.executemany("UPDATE students SET slot = ? WHERE roll_number = ?", [("Tuesday 2-5 PM", "GIAIC-000001")] * 3)
+        conn.commit()
+    assert database.query_count() == 2
@@ -0,0 +1,16 @@
+import io
+
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+import export
+
+
+def test_deferred_export_returns_data_streamlit_accepts(portal_db):
+    data = export.deferred_export('students', 'columnar')()
+    converted, _ = convert_data_to_bytes_and_infer_mime(data, TypeError("unsupported"))
+
+    expected = io.BytesIO()
+    export.export_to_file(expected, 'students', 'columnar')
+    assert converted == expected.getvalue()
+    (schema, group), = export.read_columnar(io.BytesIO(converted))
+    assert group['username'] == ['student']
@@ -0,0 +1,37 @@
+from PIL import ImageChops  # type: ignore
+
+import features
+
+STUDENT = {'name': "Ayesha Khan", 'roll_no': "GIAIC-000001", 'email': "ayesha@example.com", 'slot': "Monday 2-5 PM",
+           'contact': "0300-0000000", 'course': "Python", 'favorite_teacher': "Sir Zia"}
+
+
+def uncached_template(layout=features.DEFAULT_LAYOUT):
+    return features._card_template.__wrapped__(layout, features.font_stamp(layout.font_path))
+
+
+def test_cached_template_card_matches_uncached(monkeypatch):
+    features.clear_card_caches()
+    cached = features.generate_id_card(STUDENT)
+    assert features.generate_id_card(STUDENT) == cached  # Drawing on the copy left the template untouched
+    monkeypatch.setattr(features, "get_card_template", uncached_template)
+    assert features.generate_id_card(STUDENT) == cached
+
+
+def test_template_is_shared_until_the_layout_changes():
+    template = features.get_card_template()
+    assert features.get_card_template() is template
+    assert ImageChops.difference(template, uncached_template()).getbbox() is None
+    retitled = features.DEFAULT_LAYOUT._replace(title="Another Title")
+    assert features.get_card_template(retitled) is not template
+
+
+def test_font_file_change_reloads_fonts(tmp_path, monkeypatch):
+    font = tmp_path / "card.ttf"
+    font.write_bytes(b"not a font")
+    monkeypatch.setattr(features.st, "error", lambda *args: None)
+    monkeypatch.setattr(features.st, "warning", lambda *args: None)
+    first = features.get_card_fonts(str(font))
+    assert features.get_card_fonts(str(font)) is first
+    font.write_bytes(b"still not a font, but longer")
+    assert features.get_card_fonts(str(font)) is not first
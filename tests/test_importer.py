@@ -0,0 +1,51 @@
+import json
+
+import database
+import importer
+import passwords
+import queries
+
+
+def roster_row(i):
+    return {
+        "username": f"user{i}", "password": "secret", "name": f"Student {i}", "roll_number": f"GIAIC-{i:06d}",
+        "class": "Batch 2024", "slot": "Monday 2-5 PM", "email": f"user{i}@example.com",
+        "contact": "0300-0000000", "course": "Python", "favorite_teacher": "Sir Zia",
+    }
+
+
+def test_malformed_jsonl_lines_are_reported_and_skipped(portal_db, tmp_path):
+    path = tmp_path / "roster.jsonl"
+    path.write_text("\n".join([
+        json.dumps(roster_row(1)),
+        '{"username": "broken",',
+        '["not", "an", "object"]',
+        json.dumps(roster_row(2)),
+    ]) + "\n", encoding="utf-8")
+
+    report = importer.import_roster(str(path))
+
+    assert (report.read, report.inserted, report.invalid) == (4, 2, 2)
+    assert [line for line, _ in report.errors] == [2, 3]
+    assert report.errors[0][1].startswith("Invalid JSON")
+    assert report.errors[1][1] == "Expected a JSON object, got list"
+    with database.get_db_connection() as cursor:
+        usernames = {row[0] for row in cursor.execute("SELECT username FROM students")}
+    assert {"user1", "user2"} <= usernames
+
+
+def test_imported_passwords_are_hashed_and_upgraded_on_login(portal_db):
+    report = importer.import_rows([(1, roster_row(1))])
+    assert report.inserted == 1
+    stored = queries.fetch_one(queries.LOGIN_SQL, ("user1",))['password']
+    assert passwords.is_hashed(stored) and stored.split('$')[1] == str(passwords.IMPORT_ITERATIONS)
+
+    assert queries.authenticate("user1", "secret") is not None
+    assert not passwords.needs_rehash(queries.fetch_one(queries.LOGIN_SQL, ("user1",))['password'])
+
+
+def test_no_plaintext_passwords_after_migrating(portal_db):
+    with database.get_db_connection() as cursor:
+        stored = [row[0] for row in cursor.execute("SELECT password FROM students")]
+    assert stored and all(passwords.is_hashed(password) for password in stored)
+    assert queries.authenticate("student", "student123") is not None
@@ -0,0 +1,47 @@
+import pytest
+
+import metrics
+from metrics import BUCKET_BOUNDS
+
+
+def histogram(*seconds):
+    h = metrics.Histogram()
+    for value in seconds:
+        h.observe(value)
+    return h
+
+
+def test_empty_histogram_reports_zero():
+    assert histogram().percentile(0.5) == 0.0
+    assert histogram().summary()['mean_ms'] == 0.0
+
+
+def test_value_on_a_bound_falls_in_that_bucket():
+    bound = BUCKET_BOUNDS[40]
+    assert histogram(bound, bound * 2).percentile(0.5) == bound
+    # Just above the bound belongs to the next bucket, capped at the largest value seen
+    assert histogram(bound * 1.0001).percentile(0.5) == bound * 1.0001
+    assert histogram(bound * 1.0001, 1.0).percentile(0.5) == BUCKET_BOUNDS[41]
+
+
+def test_values_past_the_last_bound_report_the_max():
+    assert histogram(BUCKET_BOUNDS[-1] * 2, BUCKET_BOUNDS[-1] * 3).percentile(0.99) == BUCKET_BOUNDS[-1] * 3
+
+
+def test_percentiles_split_on_rank():
+    h = histogram(*([BUCKET_BOUNDS[10]] * 90 + [BUCKET_BOUNDS[20]] * 9 + [BUCKET_BOUNDS[30]]))
+    assert h.percentile(0.5) == h.percentile(0.9) == BUCKET_BOUNDS[10]
+    assert h.percentile(0.91) == h.percentile(0.99) == BUCKET_BOUNDS[20]
+    assert h.percentile(1.0) == BUCKET_BOUNDS[30]
+    assert h.summary()['max_ms'] == pytest.approx(BUCKET_BOUNDS[30] * 1000)
+
+
+def test_reset_drops_histograms_and_profiles():
+    registry = metrics.MetricsRegistry()
+    registry.observe('page.Home', 0.01)
+    registry.profiles.append(('Home', 0.01, 'report'))
+    registry.reset()
+    assert registry.snapshot() == []
+    assert not registry.profiles
+    registry.observe('page.Home', 0.02)
+    assert [row['count'] for row in registry.snapshot()] == [1]
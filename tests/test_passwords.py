@@ -0,0 +1,39 @@
+import threading
+import time
+
+import pytest
+
+import passwords
+
+STORED = passwords.hash_password("secret", iterations=1000)
+
+
+@pytest.fixture
+def pool():
+    pool = passwords.PasswordPool(workers=1, max_pending=2)
+    release = threading.Event()
+    pool._submit(release.wait)  # Occupies the only worker
+    yield pool
+    release.set()
+    pool.shutdown()
+
+
+def test_full_pool_raises_busy(pool):
+    pool._submit(time.sleep, 0)  # Takes the last slot
+    with pytest.raises(passwords.PasswordPoolBusy):
+        pool.verify("secret", STORED, timeout=0.1)
+
+
+def test_slow_result_raises_busy_and_frees_its_slot(pool):
+    with pytest.raises(passwords.PasswordPoolBusy):
+        pool.verify("secret", STORED, timeout=0.1)
+    assert pool._slots.acquire(timeout=0)  # The cancelled verification gave its slot back
+
+
+def test_slot_and_result_waits_share_one_deadline(pool):
+    queued = pool._submit(time.sleep, 0)  # Takes the last slot
+    threading.Timer(0.2, queued.cancel).start()
+    start = time.monotonic()
+    with pytest.raises(passwords.PasswordPoolBusy):
+        pool.verify("secret", STORED, timeout=0.3)
+    assert time.monotonic() - start < 0.45
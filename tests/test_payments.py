@@ -0,0 +1,75 @@
+import asyncio
+import time
+
+import pytest
+
+import database
+import payments
+
+
+def wait_settled(intent_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        intent = payments.get_intent(intent_id)
+        if intent['status'] in payments.FINAL_STATUSES:
+            return intent
+        time.sleep(0.01)
+    raise AssertionError(f"Payment intent {intent_id} did not settle")
+
+
+def stored_token(intent_id):
+    with database.get_db_connection() as cursor:
+        return cursor.execute("SELECT token FROM payment_intents WHERE id = ?", (intent_id,)).fetchone()[0]
+
+
+def test_gateway_is_abstract():
+    with pytest.raises(TypeError):
+        payments.Gateway()
+
+
+def test_simulated_gateway_replays_outcome_per_key(monkeypatch):
+    import features
+    outcomes = iter([("success", "Payment successful"), ("failure", "Card declined")])
+    monkeypatch.setattr(features, "process_payment", lambda amount, token: next(outcomes))
+    gateway = payments.SimulatedGateway(remembered=1)
+
+    async def charges():
+        first = await gateway.charge(10, "tok", "key-1")
+        again = await gateway.charge(10, "tok", "key-1")
+        other = await gateway.charge(10, "tok", "key-2")
+        return first, again, other
+
+    first, again, other = asyncio.run(charges())
+    assert first == again == ("success", "Payment successful")
+    assert other == ("failure", "Card declined")
+    assert list(gateway._outcomes) == ["key-2"]  # Oldest key evicted
+
+
+def test_settled_intent_drops_token(portal_db):
+    processor = payments.PaymentProcessor(payments.FakeGateway(latency=0))
+    try:
+        intent_id = processor.submit(25, "tok_secret", "key-1")
+        assert processor.submit(25, "tok_secret", "key-1") == intent_id
+        assert wait_settled(intent_id)['status'] == payments.SUCCEEDED
+    finally:
+        processor.close()
+    assert stored_token(intent_id) == ""
+
+
+def test_live_lease_is_not_reclaimed(portal_db):
+    intent_id = payments.create_intent(25, "tok", "key-1")
+    claimed = payments._claim(10, "worker-a", lease=60)
+    assert [row['id'] for row in claimed] == [intent_id]
+    assert payments._claim(10, "worker-b", lease=60) == []
+    # Only the owner can record the outcome
+    assert not payments._settle(intent_id, "worker-b", payments.SUCCEEDED, "Payment successful")
+    assert payments._settle(intent_id, "worker-a", payments.SUCCEEDED, "Payment successful")
+    assert stored_token(intent_id) == ""
+
+
+def test_expired_lease_is_taken_over(portal_db):
+    intent_id = payments.create_intent(25, "tok", "key-1")
+    payments._claim(10, "worker-a", lease=-1)  # Already expired, as if worker-a died mid-charge
+    claimed = payments._claim(10, "worker-b", lease=60)
+    assert [(row['id'], row['token'], row['attempts']) for row in claimed] == [(intent_id, "tok", 2)]
+    assert not payments._reschedule(intent_id, "worker-a", "late", time.time())
@@ -0,0 +1,39 @@
+from io import BytesIO
+
+from PIL import Image
+
+import database
+import photos
+
+
+def png_bytes(color="red"):
+    buffer = BytesIO()
+    Image.new("RGB", (40, 60), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def add_student(cursor, i, photo=None):
+    cursor.execute("INSERT INTO students (username, password, name, roll_number, class, slot, photo) "
+                   "VALUES (?, 'pw', ?, ?, 'Batch 2024', 'Monday 2-5 PM', ?)",
+                   (f"user{i}", f"Student {i}", f"GIAIC-{i:06d}", photo))
+    return cursor.lastrowid
+
+
+def test_migration_keeps_undecodable_legacy_photos(portal_db):
+    with database.get_db_connection() as cursor:
+        good = add_student(cursor, 1, png_bytes())
+        bad = add_student(cursor, 2, b"not an image")
+        assert photos.migrate_inline_photos(cursor, batch_size=1) == 1
+        rows = {row['id']: row for row in cursor.execute("SELECT id, photo, photo_hash FROM students")}
+    assert rows[good]['photo'] is None and photos.get_card_thumbnail(rows[good]['photo_hash'])
+    assert rows[bad]['photo'] == b"not an image" and rows[bad]['photo_hash'] is None
+
+
+def test_set_student_photo_fills_the_thumbnails(portal_db):
+    with database.get_db_connection() as cursor:
+        student_id = add_student(cursor, 1)
+    digest = photos.set_student_photo(student_id, png_bytes("blue"))
+    with database.get_db_connection() as cursor:
+        assert cursor.execute("SELECT photo_hash FROM students WHERE id = ?", (student_id,)).fetchone()[0] == digest
+    assert Image.open(BytesIO(photos.get_card_thumbnail(digest))).size == (photos.PHOTO_WIDTH, photos.PHOTO_HEIGHT)
+    assert photos.get_display_thumbnail(digest)
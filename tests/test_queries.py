@@ -0,0 +1,37 @@
+import sqlite3
+
+import pytest
+
+import database
+import queries
+
+
+def test_queries_use_their_indexes(portal_db):
+    plans = queries.check_query_plans()
+    assert set(plans) == set(queries.EXPECTED_PLANS)
+
+
+def test_check_query_plans_rejects_an_unindexed_query(portal_db, monkeypatch):
+    monkeypatch.setitem(queries.EXPECTED_PLANS, "SELECT id FROM students WHERE class = ?", "INDEX idx_students_slot")
+    with pytest.raises(AssertionError, match="does not use"):
+        queries.check_query_plans()
+
+
+def test_register_two_students(portal_db):
+    first = queries.register_student("ann", "secret")
+    second = queries.register_student("bob", "secret")
+    assert first != second
+    assert queries.get_profile("ann")['roll_number'].startswith(queries.PENDING_ROLL_PREFIX)
+    with database.get_db_connection() as cursor:
+        assert cursor.execute("SELECT COUNT(*) FROM slot_headcounts WHERE slot = ''").fetchone()[0] == 0
+
+
+def test_duplicate_message_names_the_conflicting_column(portal_db):
+    queries.register_student("ann", "secret")
+    with pytest.raises(sqlite3.IntegrityError) as error:
+        queries.register_student("ann", "other")
+    assert queries.duplicate_message(error.value) == "Username already exists."
+    queries.create_student("cat", "secret", "Cat", "GIAIC-1", "Batch 2024", "Monday 2-5 PM")
+    with pytest.raises(sqlite3.IntegrityError) as error:
+        queries.create_student("dan", "secret", "Dan", "GIAIC-1", "Batch 2024", "Monday 2-5 PM")
+    assert queries.duplicate_message(error.value) == queries.DUPLICATE_MESSAGES['students.roll_number']
@@ -0,0 +1,34 @@
+import pytest
+
+import database
+import reference
+
+
+def test_snapshot_is_read_only_and_shared(portal_db):
+    data = reference.get_reference_data()
+    assert reference.get_reference_data() is data
+    assert isinstance(data.courses, tuple)
+    with pytest.raises(TypeError):
+        data.slot_teachers["Friday 9-12 AM"] = "Nobody"
+    with pytest.raises(TypeError):
+        data.faqs["New topic"] = ("Question?",)
+
+
+def test_write_helpers_invalidate_the_snapshot(portal_db):
+    reference.add_course("Rust")
+    assert reference.get_reference_data().courses[-1] == "Rust"
+    reference.set_slot_teacher("Friday 9-12 AM", "Sir Ali")
+    reference.set_slot_teacher("Friday 9-12 AM", "Sir Zia")
+    assert reference.get_reference_data().slot_teachers["Friday 9-12 AM"] == "Sir Zia"
+    reference.add_faq("Payments", "Can I pay in instalments?")
+    reference.add_faq("Payments", "Can I pay in instalments?")
+    assert reference.get_reference_data().faqs["Payments"] == ("Can I pay in instalments?",)
+
+
+def test_outside_writes_show_after_invalidation(portal_db):
+    before = reference.get_reference_data()
+    with database.get_db_connection() as cursor:
+        cursor.execute("INSERT INTO courses (name) VALUES ('Go')")
+    assert reference.get_reference_data() is before  # Served from the snapshot until it expires
+    reference.invalidate_reference_data()
+    assert "Go" in reference.get_reference_data().courses
@@ -0,0 +1,85 @@
+import sqlite3
+
+import pytest
+
+import database
+import queries
+import search
+
+
+def add_student(cursor, username, name, slot="Monday 2-5 PM"):
+    cursor.execute("INSERT INTO students (username, password, name, roll_number, class, slot) "
+                   "VALUES (?, 'pw', ?, ?, 'Batch 2024', ?)", (username, name, f"GIAIC-{username}", slot))
+    return cursor.lastrowid
+
+
+def names(rows):
+    return [row['name'] for row in rows]
+
+
+@pytest.mark.parametrize("text, expression", [
+    ("Aye KHA", '"aye"* "kha"*'),
+    ("giaic-0012", '"giaic"* "0012"*'),
+    ('ali" OR name:* NEAR(x', '"ali"* "or"* "name"* "near"* "x"*'),
+    ("  -*()\" ", None),
+])
+def test_match_expression_quotes_every_word_as_a_prefix(text, expression):
+    assert search.match_expression(text) == expression
+
+
+def test_operators_in_user_input_are_searched_as_words(portal_db):
+    with database.get_db_connection() as cursor:
+        add_student(cursor, "u1", "Ali Or Khan")
+    assert names(search.search_students('ali" OR (kha')) == ["Ali Or Khan"]
+
+
+def test_index_follows_inserts_updates_and_deletes(portal_db):
+    with database.get_db_connection() as cursor:
+        student_id = add_student(cursor, "u1", "Ayesha Khan")
+    assert names(search.search_students("aye kha")) == ["Ayesha Khan"]
+    with database.get_db_connection() as cursor:
+        cursor.execute("UPDATE students SET name = 'Sara Malik' WHERE id = ?", (student_id,))
+    assert search.search_students("ayesha") == []
+    assert names(search.search_students("mal")) == ["Sara Malik"]
+    with database.get_db_connection() as cursor:
+        cursor.execute("DELETE FROM students WHERE id = ?", (student_id,))
+    assert search.search_students("sara") == []
+    search.check_integrity()
+
+
+def test_check_integrity_detects_a_stale_index(portal_db):
+    with database.get_db_connection() as cursor:
+        student_id = add_student(cursor, "u1", "Ayesha Khan")
+        # Bypass the triggers: the index no longer matches the row
+        cursor.execute("UPDATE students_fts SET name = 'Someone Else' WHERE rowid = ?", (student_id,))
+    with pytest.raises(sqlite3.DatabaseError):
+        search.check_integrity()
+
+
+def test_best_match_wins_over_newer_weaker_matches(portal_db, monkeypatch):
+    monkeypatch.setattr(search, "MAX_CANDIDATES", 5)
+    with database.get_db_connection() as cursor:
+        add_student(cursor, "u0", "Zara Ahmed")
+        for i in range(4):
+            add_student(cursor, f"u{i + 1}", f"Student {i}", slot="Zara Hall")
+    assert names(search.search_students("zara", limit=1)) == ["Zara Ahmed"]
+
+
+def test_broad_prefix_ranks_only_the_newest_candidates(portal_db, monkeypatch):
+    monkeypatch.setattr(search, "MAX_CANDIDATES", 5)
+    with database.get_db_connection() as cursor:
+        add_student(cursor, "u0", "Zara Ahmed")
+        for i in range(8):
+            add_student(cursor, f"u{i + 1}", f"Student {i}", slot="Zara Hall")
+    assert set(names(search.search_students("zara"))) == {f"Student {i}" for i in range(3, 8)}
+
+
+def test_feedback_search_returns_an_excerpt(portal_db):
+    with database.get_db_connection() as cursor:
+        student_id = add_student(cursor, "u1", "Ayesha Khan")
+        course = cursor.execute("SELECT name FROM courses LIMIT 1").fetchone()['name']
+    queries.add_feedback(student_id, course, "The async lectures were excellent")
+    results = search.search("excel")
+    assert [row['student'] for row in results['feedback']] == ["Ayesha Khan"]
+    assert "**excellent**" in results['feedback'][0]['excerpt']
+    assert [row['name'] for row in search.search_courses(course)] == [course]
@@ -8,8 +8,11 @@ def display_success(message: str) -> None:
     """Displays a success message in Streamlit."""
     st.success(message)
 
-def validate_input(name: str, roll_no: str, email: str, slot: str, contact: str, course: str, favorite_teacher: str, photo: bytes) -> str | None:
-    """Validates input fields, returns error message or None if all inputs are valid."""
+def validate_input(name: str, roll_no: str, email: str, slot: str, contact: str, course: str, favorite_teacher: str, photo: bytes, require_photo: bool = True) -> str | None:
+    """Validates input fields, returns error message or None if all inputs are valid.
+
+    Bulk roster imports pass require_photo=False since rosters carry no images.
+    """
     if not name.strip():
         return "Please enter your name."
     if not roll_no.strip():
@@ -24,7 +27,7 @@ def validate_input(name: str, roll_no: str, email: str, slot: str, contact: str,
         return "Please select a course."
     if not favorite_teacher.strip():
         return "Please select your favorite teacher."
-    if not photo:
+    if require_photo and not photo:
         return "Please upload a photo."
     return None  # All valid
 